@@ -0,0 +1,302 @@
+"""
+A depth-limited negamax searcher with alpha-beta pruning, iterative deepening,
+killer and history move ordering and a fixed-size transposition table.
+
+Run as a script to measure search speed over the reference positions, e.g.
+
+    python -m hive.alphabeta --depth 2
+"""
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import argparse
+import time
+
+import hive.game
+import hive.perft
+import hive.tiles
+
+WIN = 1_000_000
+# scores beyond this are wins or losses found by the search, offset by the
+# number of plies to reach them
+_WIN_BOUND = WIN - 1000
+
+# bounds stored in the transposition table
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+
+class Entry(NamedTuple):
+    hash: int
+    depth: int
+    score: int
+    bound: int
+    move: Optional[hive.game.Move]
+    generation: int
+
+
+class TranspositionTable:
+    """
+    A fixed number of slots indexed by hash, so memory use never grows past
+    the size it was created with. A slot is overwritten by a search at least
+    as deep as the one stored there, or by anything once the stored entry is
+    left over from an earlier search.
+    """
+    def __init__(self, size: int = 1 << 16):
+        if size < 1:
+            raise ValueError("Transposition table needs at least one slot")
+
+        self.size = size
+        self.slots: List[Optional[Entry]] = [None] * size
+        self.generation = 0
+
+    def new_search(self):
+        self.generation += 1
+
+    def probe(self, key: int) -> Optional[Entry]:
+        entry = self.slots[key % self.size]
+        if entry is None or entry.hash != key:
+            return None
+
+        return entry
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: Optional[hive.game.Move]):
+        slot = key % self.size
+        entry = self.slots[slot]
+        if entry is None or entry.generation != self.generation or depth >= entry.depth:
+            self.slots[slot] = Entry(key, depth, score, bound, move, self.generation)
+
+    def clear(self):
+        self.slots = [None] * self.size
+
+
+class SearchResult(NamedTuple):
+    move: hive.game.Move
+    score: int
+    depth: int
+    nodes: int
+
+
+def evaluate(game: hive.game.Game) -> int:
+    """
+    Scores the position for the player to move, favouring more tiles around
+    the opponent's bee than our own and penalising pinned tiles, which can't
+    move.
+    """
+    score = 0
+    pinned = game.analysis().pinned
+    for index, tile in game.board.items():
+        sign = 1 if tile.colour == game.active_player.colour else -1
+        if type(tile) is hive.tiles.Bee:
+            score -= sign * 100 * bin(game.board.occupancy(index)).count("1")
+        elif index in pinned:
+            score -= sign * 5
+
+    return score
+
+
+def _terminal_score(result: float, colour: hive.tiles.Colour, ply: int) -> int:
+    if result == 0.5:
+        return 0
+
+    won = (result == 1.0) == (colour == hive.tiles.Colour.WHITE)
+    # prefer quicker wins and slower losses
+    return WIN - ply if won else ply - WIN
+
+
+def _leaf_score(game: hive.game.Game, depth: int, ply: int) -> Optional[int]:
+    # scores finished games and the horizon, or None to keep searching
+    result = game.result
+    if result is not None:
+        return _terminal_score(result, game.active_player.colour, ply)
+    if depth == 0:
+        return evaluate(game)
+
+    return None
+
+
+def _to_table(score: int, ply: int) -> int:
+    # win scores are stored relative to the node rather than the root
+    if score > _WIN_BOUND:
+        return score + ply
+    if score < -_WIN_BOUND:
+        return score - ply
+
+    return score
+
+
+def _from_table(score: int, ply: int) -> int:
+    if score > _WIN_BOUND:
+        return score - ply
+    if score < -_WIN_BOUND:
+        return score + ply
+
+    return score
+
+
+def _narrow(bound: int, score: int, alpha: int, beta: int) -> Tuple[int, int]:
+    # tightens the window using a stored score, closing it for exact scores
+    if bound == EXACT:
+        return score, score
+    if bound == LOWER:
+        return max(alpha, score), beta
+
+    return alpha, min(beta, score)
+
+
+def _bound(score: int, alpha: int, beta: int) -> int:
+    if score <= alpha:
+        return UPPER
+    if score >= beta:
+        return LOWER
+
+    return EXACT
+
+
+class AlphaBeta:
+    def __init__(self, table_size: int = 1 << 16):
+        self.table = TranspositionTable(table_size)
+        self.nodes = 0
+        self._deadline: Optional[float] = None
+        self._stopped = False
+        self._killers: Dict[int, List[hive.game.Move]] = {}
+        self._history: Dict[hive.game.Move, int] = {}
+        self._best_move: Optional[hive.game.Move] = None
+
+    def _out_of_time(self) -> bool:
+        # every node generates moves, which takes far longer than reading the
+        # clock, so the clock is read at every node
+        if self._deadline is not None and not self._stopped:
+            self._stopped = time.perf_counter() >= self._deadline
+
+        return self._stopped
+
+    def _order(
+        self,
+        moves: List[hive.game.Move],
+        table_move: Optional[hive.game.Move],
+        ply: int,
+    ) -> List[hive.game.Move]:
+        # the table move first, then killers, then by history score
+        killers = self._killers.get(ply, [])
+        return sorted(
+            moves,
+            key=lambda move: (move == table_move, move in killers, self._history.get(move, 0)),
+            reverse=True,
+        )
+
+    def _cutoff(self, move: hive.game.Move, depth: int, ply: int):
+        killers = self._killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self._history[move] = self._history.get(move, 0) + depth * depth
+
+    def _negamax(self, game: hive.game.Game, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self._out_of_time():
+            return 0
+
+        leaf_score = _leaf_score(game, depth, ply)
+        if leaf_score is not None:
+            return leaf_score
+
+        original_alpha = alpha
+        entry = self.table.probe(game.hash)
+        if entry is not None and entry.depth >= depth and ply > 0:
+            score = _from_table(entry.score, ply)
+            alpha, beta = _narrow(entry.bound, score, alpha, beta)
+            if alpha >= beta:
+                return score
+
+        table_move = None if entry is None else entry.move
+        moves = self._order(game.legal_moves() or [hive.game.Pass()], table_move, ply)
+        best_score, best_move = -WIN - 1, moves[0]
+        for move in moves:
+            game.push(move)
+            score = -self._negamax(game, depth - 1, -beta, -alpha, ply + 1)
+            game.pop()
+            if self._stopped:
+                return 0
+
+            if score > best_score:
+                best_score, best_move = score, move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                self._cutoff(move, depth, ply)
+                break
+
+        bound = _bound(best_score, original_alpha, beta)
+        self.table.store(game.hash, depth, _to_table(best_score, ply), bound, best_move)
+        if ply == 0:
+            self._best_move = best_move
+
+        return best_score
+
+    def search(
+        self,
+        game: hive.game.Game,
+        max_depth: Optional[int] = None,
+        time_ms: Optional[float] = None,
+    ) -> SearchResult:
+        """
+        Searches one ply deeper at a time until the depth or time budget runs
+        out, returning the result of the deepest search that completed. The
+        game is left as it was found.
+        """
+        if max_depth is None and time_ms is None:
+            raise ValueError("A depth or time budget is required")
+
+        self._deadline = None if time_ms is None else time.perf_counter() + time_ms / 1000
+        self._stopped = False
+        self._killers = {}
+        self._history = {}
+        self.nodes = 0
+        self._best_move = None
+        self.table.new_search()
+
+        # there's nothing to search once the game is decided
+        if game.result is not None:
+            return SearchResult(hive.game.Pass(), _terminal_score(game.result, game.active_player.colour, 0), 0, 0)
+
+        moves = game.legal_moves() or [hive.game.Pass()]
+        result = SearchResult(moves[0], 0, 0, 0)
+        depth = 0
+        while max_depth is None or depth < max_depth:
+            depth += 1
+            score = self._negamax(game, depth, -WIN - 1, WIN + 1, 0)
+            if self._stopped:
+                break
+
+            assert self._best_move is not None
+            result = SearchResult(self._best_move, score, depth, self.nodes)
+            # nothing more to learn once the only move is known or the game
+            # is decided
+            if len(moves) == 1 or abs(score) > _WIN_BOUND:
+                break
+
+        return result._replace(nodes=self.nodes)
+
+
+def benchmark(depth: int, positions: Sequence[str], board_types: Sequence[str]):
+    print(f"{'position':<20}{'board':<12}{'score':>10}{'nodes':>10}{'nodes/s':>12}")
+    for name in positions:
+        for board_name in board_types:
+            game = hive.perft.setup(hive.perft.POSITIONS[name](), board_type=hive.perft.BOARD_TYPES[board_name])
+            start = time.perf_counter()
+            result = AlphaBeta().search(game, max_depth=depth)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<20}{board_name:<12}{result.score:>10}{result.nodes:>10}{result.nodes / elapsed:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark alpha-beta search over the reference positions")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--position", choices=list(hive.perft.POSITIONS), action="append")
+    parser.add_argument("--board", choices=list(hive.perft.BOARD_TYPES), action="append")
+    args = parser.parse_args()
+
+    benchmark(args.depth, args.position or list(hive.perft.POSITIONS), args.board or list(hive.perft.BOARD_TYPES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Analysis of a single position shared by everything that reads it, so that
+the moves of each tile are worked out once per position rather than once by
+move generation and again by move validation.
+"""
+from typing import AbstractSet, Dict, List, Set, Tuple
+
+import hive.board
+import hive.tiles
+
+
+class Analysis:
+    """
+    The moves of each tile, worked out on first use and kept, along with the
+    cells whose tiles the one hive rule stops from moving, which the board
+    keeps itself. The analysis goes stale once the board changes.
+    """
+    def __init__(self, board: hive.board.BaseBoard):
+        self.board = board
+        self._moves: Dict[Tuple[int, int], Set[Tuple[int, int]]] = {}
+
+    @property
+    def pinned(self) -> AbstractSet[Tuple[int, int]]:
+        return self.board.pinned()
+
+    def moves(self, index: Tuple[int, int]) -> Set[Tuple[int, int]]:
+        """
+        Returns the cells the tile on the given cell could move to, regardless
+        of the one hive rule or whose turn it is.
+        """
+        moves = self._moves.get(index)
+        if moves is None:
+            tile = self.board[index]
+            assert tile is not None
+            moves = tile.valid_moves(index, self.board)
+            self._moves[index] = moves
+
+        return moves
+
+    def movable(self, colour: hive.tiles.Colour) -> List[Tuple[int, int]]:
+        """
+        Returns the cells of the tiles of the given colour free to move.
+        """
+        pinned = self.pinned
+        return [index for index, tile in self.board.items() if tile.colour == colour and index not in pinned]
@@ -0,0 +1,377 @@
+"""
+Light random playouts of many games at once, holding the games as stacked
+numpy planes and advancing them all in lockstep, one random move per game.
+
+The move generator is vectorised across the whole batch, so only covers the
+moves that can be found with a fixed number of array operations:
+
+* every legal placement
+* single slides of the bee, beetle and ant
+* every grasshopper jump
+
+Tiles may only move when their neighbours form one contiguous run, which
+guarantees the hive stays connected without a per game search, so tiles in
+rings, spiders and longer ant moves are left out. A game without any of the
+moves covered falls back on Game to find its moves, only passing when it
+really has no legal move.
+"""
+from typing import List, Optional, Tuple
+import numpy as np
+
+import hive.board
+import hive.game
+import hive.tiles
+
+EMPTY = -1
+
+_BEE = hive.tiles.TILE_KINDS[hive.tiles.Bee]
+_GRASSHOPPER = hive.tiles.TILE_KINDS[hive.tiles.Grasshopper]
+# kinds of tile that move by a single slide
+_STEPPERS = np.array([
+    tile_type in (hive.tiles.Bee, hive.tiles.Beetle, hive.tiles.Ant) for tile_type in hive.tiles.TILE_TYPES
+])
+
+_RUNS = np.array(hive.board.RUNS, dtype=np.int8)
+# whether a tile may slide towards each position, indexed by position and
+# then the tile's neighbour occupancy mask
+_SLIDES = np.array([[position in hive.board.SLIDES[mask] for mask in range(64)] for position in range(6)])
+
+# the candidate moves are laid out as planes of cells, one per type of tile
+# for placements, then one per direction for slides and for jumps
+_PLACEMENTS = 0
+_STEPS = len(hive.tiles.TILE_TYPES)
+_JUMPS = _STEPS + 6
+_PLANES = _JUMPS + 6
+
+
+def _shift(planes: np.ndarray, offset: Tuple[int, int]) -> np.ndarray:
+    # moves each cell's neighbour at the offset onto the cell, filling in
+    # zeros past the edges of the grid
+    (width, height) = planes.shape[-2:]
+    (dx, dy) = offset
+    shifted = np.zeros_like(planes)
+    shifted[..., max(-dx, 0):width - max(dx, 0), max(-dy, 0):height - max(dy, 0)] = (
+        planes[..., max(dx, 0):width - max(-dx, 0), max(dy, 0):height - max(-dy, 0)]
+    )
+    return shifted
+
+
+def _neighbour_masks(occupied: np.ndarray) -> np.ndarray:
+    # the vectorised equivalent of BaseBoard.occupancy, for every cell
+    masks = np.zeros(occupied.shape, dtype=np.uint8)
+    for position, offset in enumerate(hive.board.NEIGHBOUR_OFFSETS):
+        masks |= _shift(occupied, offset).astype(np.uint8) << position
+
+    return masks
+
+
+class BatchGame:
+    """
+    A batch of games, each held on a square grid of cells indexed like
+    Board.grid, with the root cell in the middle. Cells on the edge of the
+    grid are never played to, so a tile's neighbours are always on the grid.
+
+    Results are 1 for a white win, 0 for a black win, 0.5 for a draw and NaN
+    while a game is still going.
+    """
+    def __init__(self, count: int, size: int = 32, seed: Optional[int] = None):
+        self.size = size
+        self.root = (size // 2, size // 2)
+        self.kinds = np.full((count, size, size), EMPTY, dtype=np.int8)
+        self.owners = np.full((count, size, size), EMPTY, dtype=np.int8)
+        # unplayed tiles of each type, for each colour
+        self.racks = np.tile(np.array(hive.tiles.TILE_COUNTS, dtype=np.int8), (count, 2, 1))
+        self.turns = np.zeros((count, 2), dtype=np.int32)
+        self.to_move = np.zeros(count, dtype=np.int8)
+        self.first_move = np.ones(count, dtype=bool)
+        self.results = np.full(count, np.nan)
+        self.rng = np.random.default_rng(seed)
+
+        self._interior = np.zeros((size, size), dtype=bool)
+        self._interior[1:-1, 1:-1] = True
+
+    @classmethod
+    def from_game(cls, game: hive.game.Game, count: int, size: int = 32, seed: Optional[int] = None) -> "BatchGame":
+        """
+        Starts every game in the batch from the given position.
+        """
+        batch = cls(count, size, seed)
+        for index, tile in game.board.items():
+            x, y = batch._to_cell(index)
+            if not (0 < x < size - 1 and 0 < y < size - 1):
+                raise ValueError(f"Tile at {index} doesn't fit on a grid of size {size}")
+            batch.kinds[:, x, y] = hive.tiles.TILE_KINDS[type(tile)]
+            batch.owners[:, x, y] = tile.colour.value
+
+        for player in (game.active_player, game.inactive_player):
+            batch.racks[:, player.colour.value] = player.rack
+            batch.turns[:, player.colour.value] = player.turn
+        batch.to_move[:] = game.active_player.colour.value
+        batch.first_move[:] = game.first_move
+        result = game.result
+        batch.results[:] = np.nan if result is None else result
+        return batch
+
+    def to_game(self, game_index: int) -> hive.game.Game:
+        """
+        Builds a Game in the position of one of the games in the batch.
+        """
+        game = hive.game.Game(board_type=hive.board.SparseBoard)
+        if self.to_move[game_index] != game.active_player.colour.value:
+            game.active_player, game.inactive_player = game.inactive_player, game.active_player
+        for player in (game.active_player, game.inactive_player):
+            player.rack = self.racks[game_index, player.colour.value].tolist()
+            player.turn = int(self.turns[game_index, player.colour.value])
+            player.bee_played = player.rack[_BEE] == 0
+        game.first_move = bool(self.first_move[game_index])
+
+        for x, y in zip(*np.nonzero(self.owners[game_index] != EMPTY)):
+            tile_type = hive.tiles.TILE_TYPES[self.kinds[game_index, x, y]]
+            game._set_tile(self._to_index(x, y), tile_type(hive.tiles.Colour(self.owners[game_index, x, y])))
+        game.hash = game.compute_hash()
+        return game
+
+    def _fall_back(self, game_index: int):
+        # plays a uniformly random legal move found by Game, in a game without
+        # any of the moves covered by the batch
+        moves = self.to_game(game_index).legal_moves()
+        if not moves:
+            return
+
+        move = moves[self.rng.integers(len(moves))]
+        assert not isinstance(move, hive.game.Pass)
+        to_x, to_y = self._to_cell(move.to_index)
+        if not (0 < to_x < self.size - 1 and 0 < to_y < self.size - 1):
+            raise ValueError(f"Move to {move.to_index} doesn't fit on a grid of size {self.size}")
+
+        colour = self.to_move[game_index]
+        if isinstance(move, hive.game.Placement):
+            kind = hive.tiles.TILE_KINDS[move.tile_type]
+            self.kinds[game_index, to_x, to_y] = kind
+            self.owners[game_index, to_x, to_y] = colour
+            self.racks[game_index, colour, kind] -= 1
+        else:
+            from_x, from_y = self._to_cell(move.from_index)
+            self.kinds[game_index, to_x, to_y] = self.kinds[game_index, from_x, from_y]
+            self.owners[game_index, to_x, to_y] = colour
+            self.kinds[game_index, from_x, from_y] = EMPTY
+            self.owners[game_index, from_x, from_y] = EMPTY
+
+    def _to_cell(self, index: Tuple[int, int]) -> Tuple[int, int]:
+        return (index[0] + self.root[0], index[1] + self.root[1])
+
+    def _to_index(self, x: int, y: int) -> Tuple[int, int]:
+        return (int(x) - self.root[0], int(y) - self.root[1])
+
+    def _window(self) -> Tuple[slice, slice]:
+        # the smallest part of the grid covering every tile in the batch and
+        # the root, plus a margin of one cell to move and place tiles into.
+        # Cells outside of it are empty, so work is limited to the window
+        occupied = self.owners != EMPTY
+        xs = np.nonzero(occupied.any(axis=(0, 2)))[0]
+        ys = np.nonzero(occupied.any(axis=(0, 1)))[0]
+        return (
+            slice(xs.min(initial=self.root[0]) - 1, xs.max(initial=self.root[0]) + 2),
+            slice(ys.min(initial=self.root[1]) - 1, ys.max(initial=self.root[1]) + 2),
+        )
+
+    def _placement_cells(
+        self,
+        occupied: np.ndarray,
+        own: np.ndarray,
+        interior: np.ndarray,
+        root: Tuple[int, int],
+    ) -> np.ndarray:
+        touches_own = _neighbour_masks(own) != 0
+        touches_other = _neighbour_masks(occupied & ~own) != 0
+        open_cells = ~occupied & interior
+
+        cells = open_cells & touches_own & ~touches_other
+        # a player's first tile may touch either colour, and the very first
+        # tile goes on the root
+        first_tile = self.turns[np.arange(len(self.to_move)), self.to_move] == 0
+        cells[first_tile] = (open_cells & (touches_own | touches_other))[first_tile]
+        cells[self.first_move] = False
+        cells[self.first_move, root[0], root[1]] = True
+        return cells
+
+    def _placeable(self) -> np.ndarray:
+        racks = self.racks[np.arange(len(self.to_move)), self.to_move]
+        placeable = racks > 0
+        # the bee must be played by each player's third turn
+        bee_due = (racks[:, _BEE] > 0) & (self.turns[np.arange(len(self.to_move)), self.to_move] >= 2)
+        placeable[bee_due] = False
+        placeable[bee_due, _BEE] = True
+        return placeable
+
+    @staticmethod
+    def _jumps(occupied: np.ndarray, grasshoppers: np.ndarray, interior: np.ndarray) -> np.ndarray:
+        # the distance jumped by a grasshopper in each direction, or 0 when it
+        # can't jump that way
+        distances = np.zeros((6,) + occupied.shape, dtype=np.int8)
+        open_cells = ~occupied & interior
+        for position, (dx, dy) in enumerate(hive.board.NEIGHBOUR_OFFSETS):
+            line = grasshoppers & _shift(occupied, (dx, dy))
+            distance = 2
+            while line.any():
+                offset = (distance * dx, distance * dy)
+                distances[position][line & _shift(open_cells, offset)] = distance
+                line &= _shift(occupied, offset)
+                distance += 1
+
+        return distances
+
+    def _candidates(self, window: Tuple[slice, slice]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns which of the candidate moves are available in each game,
+        laid out as planes of the cells in the window, along with the
+        grasshopper jump lengths.
+        """
+        owners = self.owners[:, window[0], window[1]]
+        kinds = self.kinds[:, window[0], window[1]]
+        interior = self._interior[window]
+        root = (self.root[0] - window[0].start, self.root[1] - window[1].start)
+
+        occupied = owners != EMPTY
+        own = owners == self.to_move[:, None, None]
+        masks = _neighbour_masks(occupied)
+        candidates = np.zeros((len(self.to_move), _PLANES) + occupied.shape[1:], dtype=bool)
+
+        cells = self._placement_cells(occupied, own, interior, root)
+        candidates[:, _PLACEMENTS:_STEPS] = cells[:, None] & self._placeable()[:, :, None, None]
+
+        # tiles may only move once their bee is down, and only when their
+        # neighbours stay connected without them
+        bee_played = self.racks[np.arange(len(self.to_move)), self.to_move, _BEE] == 0
+        movable = own & bee_played[:, None, None] & (_RUNS[masks] == 1)
+        steppers = movable & _STEPPERS[kinds]
+        for position, offset in enumerate(hive.board.NEIGHBOUR_OFFSETS):
+            candidates[:, _STEPS + position] = steppers & _SLIDES[position][masks] & _shift(interior, offset)
+
+        jumps = self._jumps(occupied, movable & (kinds == _GRASSHOPPER), interior)
+        candidates[:, _JUMPS:] = np.moveaxis(jumps, 0, 1) > 0
+
+        # finished games have no moves
+        candidates[~np.isnan(self.results)] = False
+        return candidates, jumps
+
+    def _decode(
+        self,
+        window: Tuple[slice, slice],
+        jumps: np.ndarray,
+        games: np.ndarray,
+        plane: np.ndarray,
+        x: np.ndarray,
+        y: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        # converts candidates at cells in the window to moves between cells
+        # on the grid, with placements going nowhere
+        distance = np.where(plane >= _JUMPS, jumps[np.clip(plane - _JUMPS, 0, 5), games, x, y], 1)
+        distance[plane < _STEPS] = 0
+        direction = np.where(plane >= _JUMPS, plane - _JUMPS, plane - _STEPS)
+        offsets = np.array(hive.board.NEIGHBOUR_OFFSETS)[direction % 6]
+        x = x + window[0].start
+        y = y + window[1].start
+        return x, y, x + distance * offsets[:, 0], y + distance * offsets[:, 1]
+
+    def legal_moves(self, game_index: int) -> List[hive.game.Move]:
+        """
+        Returns the moves covered by the batch that are available in one of
+        its games.
+        """
+        window = self._window()
+        candidates, jumps = self._candidates(window)
+        plane, x, y = np.nonzero(candidates[game_index])
+        games = np.full(len(plane), game_index)
+        from_x, from_y, to_x, to_y = self._decode(window, jumps, games, plane, x, y)
+
+        moves: List[hive.game.Move] = []
+        for i in range(len(plane)):
+            if plane[i] < _STEPS:
+                moves.append(hive.game.Placement(hive.tiles.TILE_TYPES[plane[i]], self._to_index(from_x[i], from_y[i])))
+            else:
+                moves.append(hive.game.Movement(
+                    self._to_index(from_x[i], from_y[i]), self._to_index(to_x[i], to_y[i]),
+                ))
+
+        return moves
+
+    def _update_results(self, window: Tuple[slice, slice]):
+        owners = self.owners[:, window[0], window[1]]
+        masks = _neighbour_masks(owners != EMPTY)
+        surrounded = (masks == 0b111111) & (self.kinds[:, window[0], window[1]] == _BEE)
+        lost = np.stack([(surrounded & (owners == colour)).any(axis=(1, 2)) for colour in (0, 1)], axis=1)
+
+        ongoing = np.isnan(self.results)
+        self.results[ongoing & lost[:, 0] & lost[:, 1]] = 0.5
+        self.results[ongoing & lost[:, 0] & ~lost[:, 1]] = 0.0
+        self.results[ongoing & ~lost[:, 0] & lost[:, 1]] = 1.0
+
+    def _choose(self, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # picks a uniformly random candidate in each game that has any,
+        # returning those games along with the plane and cell picked. The
+        # plane is found first, so only one plane per game is searched for
+        # the cell
+        count = len(self.to_move)
+        candidates = candidates.reshape(count, _PLANES, -1)
+        per_plane = candidates.sum(axis=2)
+        totals = per_plane.sum(axis=1)
+        games = np.nonzero(totals)[0]
+
+        picks = (self.rng.random(len(games)) * totals[games]).astype(np.int64)
+        planes_before = np.cumsum(per_plane[games], axis=1)
+        plane = np.argmax(planes_before > picks[:, None], axis=1)
+        picks -= planes_before[np.arange(len(games)), plane] - per_plane[games, plane]
+        cells_before = np.cumsum(candidates[games, plane], axis=1)
+        cell = np.argmax(cells_before > picks[:, None], axis=1)
+        return games, plane, cell
+
+    def step(self):
+        """
+        Plays a uniformly random move out of those covered in every game
+        still going. Games without any fall back on a uniformly random legal
+        move found by Game, passing when there are none.
+        """
+        window = self._window()
+        candidates, jumps = self._candidates(window)
+        games, plane, cell = self._choose(candidates)
+        uncovered = np.isnan(self.results)
+        uncovered[games] = False
+        for game_index in np.nonzero(uncovered)[0]:
+            self._fall_back(game_index)
+
+        x, y = np.divmod(cell, candidates.shape[3])
+        from_x, from_y, to_x, to_y = self._decode(window, jumps, games, plane, x, y)
+
+        placing = plane < _STEPS
+        colours = self.to_move[games[placing]]
+        self.kinds[games[placing], from_x[placing], from_y[placing]] = plane[placing]
+        self.owners[games[placing], from_x[placing], from_y[placing]] = colours
+        self.racks[games[placing], colours, plane[placing]] -= 1
+
+        games, from_x, from_y, to_x, to_y = (
+            games[~placing], from_x[~placing], from_y[~placing], to_x[~placing], to_y[~placing]
+        )
+        self.kinds[games, to_x, to_y] = self.kinds[games, from_x, from_y]
+        self.owners[games, to_x, to_y] = self.owners[games, from_x, from_y]
+        self.kinds[games, from_x, from_y] = EMPTY
+        self.owners[games, from_x, from_y] = EMPTY
+
+        # everyone still playing takes a turn, even when passing
+        ongoing = np.isnan(self.results)
+        self.turns[np.nonzero(ongoing)[0], self.to_move[ongoing]] += 1
+        self.to_move[ongoing] ^= 1
+        self.first_move[ongoing] = False
+        self._update_results(window)
+
+    def playout(self, max_plies: int = 100) -> np.ndarray:
+        """
+        Steps every game until it finishes or the ply limit is reached,
+        returning the results with unfinished games scored as draws.
+        """
+        for _ in range(max_plies):
+            if not np.isnan(self.results).any():
+                break
+            self.step()
+
+        return np.where(np.isnan(self.results), 0.5, self.results)
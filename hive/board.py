@@ -1,23 +1,114 @@
-from typing import Generic, List, Optional, Set, Tuple, TypeVar
+from typing import Any, AbstractSet, Dict, Generic, Iterator, List, MutableMapping, Optional, Set, Tuple, TypeVar
+import copy
 import logging
-import numpy as np
+
+import hive.persistent
+
+_np: Any = None
+
+
+def _numpy() -> Any:
+    # numpy is slow to import and only the dense board needs it, so it's
+    # imported on first use rather than along with the module
+    global _np
+    if _np is None:
+        import numpy
+        _np = numpy
+
+    return _np
+
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
 T = TypeVar("T")
 
+# offsets to the six neighbouring cells, in clockwise order starting from north
+NEIGHBOUR_OFFSETS: Tuple[Tuple[int, int], ...] = (
+    (0, 1),
+    (1, 0),
+    (1, -1),
+    (0, -1),
+    (-1, 0),
+    (-1, 1),
+)
+
+
+# the position of each neighbouring cell, relative to the centre
+NEIGHBOUR_POSITIONS: Dict[Tuple[int, int], int] = {
+    offset: position for position, offset in enumerate(NEIGHBOUR_OFFSETS)
+}
+
+
+def _slide_directions(mask: int) -> Tuple[int, ...]:
+    # a tile may slide into an empty neighbouring cell when exactly one of the
+    # two cells either side of the gap is occupied. Both occupied means the
+    # gap is too narrow to slide through, neither means losing contact with
+    # the hive part way through the slide
+    return tuple(
+        position for position in range(6)
+        if not mask & (1 << position) and
+        bool(mask & (1 << ((position - 1) % 6))) != bool(mask & (1 << ((position + 1) % 6)))
+    )
+
+
+def _runs(mask: int) -> int:
+    # counts the contiguous runs of occupied neighbours around a cell. The
+    # tiles within a run touch each other, so are connected without the cell
+    if mask == 0b111111:
+        return 1
+
+    return sum(
+        1 for position in range(6)
+        if mask & (1 << position) and not mask & (1 << ((position - 1) % 6))
+    )
+
+
+# lookup tables indexed by a cell's neighbour occupancy mask (see
+# BaseBoard.occupancy), giving the positions a tile on the cell may slide to
+# and the number of contiguous runs of neighbours
+SLIDES: Tuple[Tuple[int, ...], ...] = tuple(_slide_directions(mask) for mask in range(64))
+RUNS: Tuple[int, ...] = tuple(_runs(mask) for mask in range(64))
 
-class Board(Generic[T]):
+
+class BaseBoard(Generic[T]):
     """
-    Class encapsulating the underlying structure representing the board.
-    Indexed by integers relative to the root, where x points along the
-    north-east direction in the hexagonal structure, y points in the north
-    direction in the hexagonal structure.
+    Interface shared by the board backends. Cells are indexed by axial
+    coordinates relative to the root, where x points along the north-east
+    direction in the hexagonal structure, y points in the north direction in
+    the hexagonal structure.
+
+    Backends provide storage via _set and _delete, writes go through this
+    class so that the derived indices (e.g. the pinned cells) stay up to date.
     """
     def __init__(self):
-        self.grid = np.full((1, 1), None)
-        self.root = (0, 0)
+        # neighbour occupancy masks of every cell with an occupied neighbour
+        self._masks: MutableMapping[Tuple[int, int], int] = self.new_map()
+        # cells reachable in a single slide, filled in on demand and cleared
+        # whenever the occupied cells change
+        self._slides: Dict[Tuple[int, int], Tuple[Tuple[int, int], ...]] = {}
+        # cells whose removal would split the hive (mapped to True), None when
+        # it needs to be recomputed
+        self._pinned: Optional[MutableMapping[Tuple[int, int], bool]] = None
+
+    def new_map(self) -> MutableMapping:
+        """
+        Returns an empty mapping of the kind this board keeps its indices in,
+        so that state derived from the board can be copied alongside it just
+        as cheaply.
+        """
+        return {}
+
+    def copy(self) -> "BaseBoard[T]":
+        """
+        Returns an independent copy of the board. Backends extend this to copy
+        their storage.
+        """
+        clone = copy.copy(self)
+        clone._masks = copy.copy(self._masks)
+        clone._slides = {}
+        clone._pinned = copy.copy(self._pinned)
+        return clone
 
     @staticmethod
     def _add(left: Tuple[int, int], right: Tuple[int, int]):
@@ -26,6 +117,229 @@ class Board(Generic[T]):
     def pretty(self):
         return "Coming soon TM"
 
+    def __getitem__(self, index: Tuple[int, int]) -> Optional[T]:
+        raise NotImplementedError()
+
+    def _set(self, index: Tuple[int, int], tile: T):
+        raise NotImplementedError()
+
+    def _delete(self, index: Tuple[int, int]):
+        raise NotImplementedError()
+
+    def __setitem__(self, index: Tuple[int, int], tile: T):
+        # TODO(james.gunn): Check for assignment of None?
+        was_empty = self[index] is None
+        self._set(index, tile)
+        if was_empty:
+            self._update_masks(index, True)
+            self._update_pinned_on_add(index)
+
+    def __delitem__(self, index: Tuple[int, int]):
+        if self[index] is None:
+            return
+
+        self._delete(index)
+        self._update_masks(index, False)
+        self._update_pinned_on_delete(index)
+
+    def items(self) -> Iterator[Tuple[Tuple[int, int], T]]:
+        """
+        Yields the index and tile of every occupied cell, in no particular
+        order.
+        """
+        raise NotImplementedError()
+
+    def _slide_targets(self, index: Tuple[int, int], mask: int) -> Tuple[Tuple[int, int], ...]:
+        return tuple(self._add(index, NEIGHBOUR_OFFSETS[position]) for position in SLIDES[mask])
+
+    def slides(self, index: Tuple[int, int], lifted: Optional[Tuple[int, int]] = None) -> Tuple[Tuple[int, int], ...]:
+        """
+        Returns the cells a tile on the given cell could reach in a single
+        slide. lifted is the cell the moving tile started from, which is
+        treated as empty during multi-step moves.
+
+        Together these form the sliding graph around the hive, which is cached
+        and shared by every tile until the occupied cells change.
+        """
+        if lifted is not None:
+            position = NEIGHBOUR_POSITIONS.get((lifted[0] - index[0], lifted[1] - index[1]))
+            if position is not None:
+                # the lifted tile was one of the neighbours, so can't be reused
+                return self._slide_targets(index, self.occupancy(index) & ~(1 << position))
+
+        slides = self._slides.get(index)
+        if slides is None:
+            slides = self._slide_targets(index, self.occupancy(index))
+            self._slides[index] = slides
+
+        return slides
+
+    def _occupied_neighbours(self, index: Tuple[int, int]) -> List[Tuple[int, int]]:
+        mask = self.occupancy(index)
+        return [
+            self._add(index, offset)
+            for position, offset in enumerate(NEIGHBOUR_OFFSETS)
+            if mask & (1 << position)
+        ]
+
+    def connected_components(self) -> int:
+        unvisited = {index for index, _ in self.items()}
+
+        num_components = 0
+        while unvisited:
+            num_components += 1
+            stack = [unvisited.pop()]
+            while stack:
+                index = stack.pop()
+                for offset in NEIGHBOUR_OFFSETS:
+                    neighbour_idx = self._add(index, offset)
+                    if neighbour_idx in unvisited:
+                        unvisited.remove(neighbour_idx)
+                        stack.append(neighbour_idx)
+
+        return num_components
+
+    def _update_masks(self, index: Tuple[int, int], occupied: bool):
+        self._slides = {}
+        for position, offset in enumerate(NEIGHBOUR_OFFSETS):
+            neighbour_idx = self._add(index, offset)
+            # this cell sits in the opposite direction from the neighbour
+            bit = 1 << ((position + 3) % 6)
+            mask = self._masks.get(neighbour_idx, 0)
+            mask = mask | bit if occupied else mask & ~bit
+            if mask:
+                self._masks[neighbour_idx] = mask
+            else:
+                del self._masks[neighbour_idx]
+
+    def occupancy(self, index: Tuple[int, int]) -> int:
+        """
+        Returns a bitmask of the occupied neighbours of the cell, bit i is set
+        when the cell at NEIGHBOUR_OFFSETS[i] is occupied.
+        """
+        return self._masks.get(index, 0)
+
+    def _update_pinned_on_add(self, index: Tuple[int, int]):
+        if self._pinned is None:
+            return
+
+        mask = self.occupancy(index)
+        count = bin(mask).count("1")
+        if count == 1:
+            # a leaf joining the hive pins its only neighbour, unless that
+            # neighbour was on its own, and leaves every other cell as it was
+            neighbour_idx = self._add(index, NEIGHBOUR_OFFSETS[mask.bit_length() - 1])
+            if bin(self.occupancy(neighbour_idx)).count("1") > 1:
+                self._pinned[neighbour_idx] = True
+        elif count > 2 or RUNS[mask] > 1:
+            # the new tile may close a ring, freeing up any number of cells.
+            # Two touching neighbours are already connected, so nothing changes
+            self._pinned = None
+
+    def _update_pinned_on_delete(self, index: Tuple[int, int]):
+        if self._pinned is None:
+            return
+
+        self._pinned.pop(index, None)
+        mask = self.occupancy(index)
+        count = bin(mask).count("1")
+        if count == 1:
+            # removing a leaf only affects its neighbour, which stays pinned
+            # unless its remaining neighbours all touch each other
+            neighbour_idx = self._add(index, NEIGHBOUR_OFFSETS[mask.bit_length() - 1])
+            if RUNS[self.occupancy(neighbour_idx)] <= 1:
+                self._pinned.pop(neighbour_idx, None)
+            else:
+                self._pinned = None
+        elif count > 2 or RUNS[mask] > 1:
+            # the removed tile may have been holding a ring together
+            self._pinned = None
+
+    def _articulation_search(
+        self,
+        root: Tuple[int, int],
+        order: Dict[Tuple[int, int], int],
+        pinned: Set[Tuple[int, int]],
+    ):
+        """
+        Iterative depth first search from root, adding the articulation points
+        of its component to pinned.
+        """
+        low = {root: len(order)}
+        order[root] = len(order)
+        root_children = 0
+        stack = [(root, iter(self._occupied_neighbours(root)))]
+        while stack:
+            parent, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                # finished with this cell, so propagate its low point upwards
+                stack.pop()
+                if stack:
+                    grandparent = stack[-1][0]
+                    low[grandparent] = min(low[grandparent], low[parent])
+                    if grandparent != root and low[parent] >= order[grandparent]:
+                        pinned.add(grandparent)
+            elif child in order:
+                low[parent] = min(low[parent], order[child])
+            else:
+                root_children += parent == root
+                low[child] = len(order)
+                order[child] = len(order)
+                stack.append((child, iter(self._occupied_neighbours(child))))
+
+        if root_children > 1:
+            pinned.add(root)
+
+    def pinned(self) -> AbstractSet[Tuple[int, int]]:
+        """
+        Returns the cells whose removal would split the hive, i.e. the pieces
+        that the one hive rule prevents from moving. The result is only valid
+        until the board is next written to, so call again rather than holding
+        on to it.
+        """
+        if self._pinned is None:
+            pinned: Set[Tuple[int, int]] = set()
+            order: Dict[Tuple[int, int], int] = {}
+            for index, _ in self.items():
+                if index not in order:
+                    self._articulation_search(index, order, pinned)
+            self._pinned = self.new_map()
+            self._pinned.update(dict.fromkeys(pinned, True))
+
+        return self._pinned.keys()
+
+    def is_pinned(self, index: Tuple[int, int]) -> bool:
+        return index in self.pinned()
+
+    def neighbours(self, index: Tuple[int, int]) -> Set[Tuple[Tuple[int, int], T]]:
+        """
+        Returns the neighbours of the specified cell., may be empty.
+
+        Neighbours are not returned in any order.
+        """
+        neighbour_tiles: Set[Tuple[Tuple[int, int], T]] = set()
+        for offset in NEIGHBOUR_OFFSETS:
+            neighbour_idx = self._add(index, offset)
+            neighbour_tile = self[neighbour_idx]
+            if neighbour_tile is not None:
+                neighbour_tiles.add((neighbour_idx, neighbour_tile))
+
+        return neighbour_tiles
+
+
+class Board(BaseBoard[T]):
+    """
+    Dense board backend storing the tiles in a numpy object grid covering the
+    bounding box of every cell that has ever been written to. Numpy is only
+    imported once a dense board is used, including one unpickled in a fresh
+    process, as it is slow to import and the other backends don't need it.
+    """
+    def __init__(self):
+        super().__init__()
+        self.grid = _numpy().full((1, 1), None)
+        self.root = (0, 0)
+
     def __getitem__(self, index: Tuple[int, int]) -> Optional[T]:
         inner_index = self._add(self.root, index)
 
@@ -37,8 +351,7 @@ class Board(Generic[T]):
 
         return self.grid[inner_index]
 
-    def __setitem__(self, index: Tuple[int, int], tile: T):
-        # TODO(james.gunn): Check for assignment of None?
+    def _set(self, index: Tuple[int, int], tile: T):
         inner_index = self._add(self.root, index)
 
         # trigger a resize if required
@@ -46,82 +359,72 @@ class Board(Generic[T]):
         pad_x_after = max(inner_index[0] - (self.grid.shape[0] - 1), 0)
         pad_y_before = max(-inner_index[1], 0)
         pad_y_after = max(inner_index[1] - (self.grid.shape[1] - 1), 0)
-        padding = np.array([
-            [pad_x_before, pad_x_after],
-            [pad_y_before, pad_y_after],
-        ], dtype=int)
-        # pad the array to permit the required index to be inserted, note that
-        # all pad values may be 0 which will not trigger a resize
-        self.grid = np.pad(self.grid, padding, constant_values=None)
-        # any padding added at the start of the grid cause a shift to the root
-        self.root = self._add(self.root, (pad_x_before, pad_y_before))
+        if pad_x_before or pad_x_after or pad_y_before or pad_y_after:
+            np = _numpy()
+            padding = np.array([
+                [pad_x_before, pad_x_after],
+                [pad_y_before, pad_y_after],
+            ], dtype=int)
+            # pad the array to permit the required index to be inserted, only
+            # done when the index lies outside the grid as it copies the grid
+            self.grid = np.pad(self.grid, padding, constant_values=None)
+            # any padding added at the start of the grid cause a shift to the
+            # root
+            self.root = self._add(self.root, (pad_x_before, pad_y_before))
 
         new_inner_index = self._add(self.root, index)
         self.grid[new_inner_index] = tile
 
-    def __delitem__(self, index: Tuple[int, int]):
+    def copy(self) -> "Board[T]":
+        clone = super().copy()
+        assert isinstance(clone, Board)
+        clone.grid = self.grid.copy()
+        return clone
+
+    def _delete(self, index: Tuple[int, int]):
         # TODO(james.gunn): Might we want to shrink the board back down?
         inner_index = self._add(self.root, index)
         self.grid[inner_index] = None
 
-    def connected_components(self) -> int:
-        non_null_tile_idxs: List[Tuple[int, int]] = []
-        for x in range(self.grid.shape[0]):
-            for y in range(self.grid.shape[1]):
-                non_null_tile_idx = (x, y)
-                if self.grid[non_null_tile_idx] is not None:
-                    non_null_tile_idxs.append(non_null_tile_idx)
-
-        def _expand(index: Tuple[int, int]):
-            # check if we've already visited this tile and ignore it (to avoid
-            # getting stuck in a loop). This works equally well for avoiding
-            # cells that are actually null.
-            if index not in non_null_tile_idxs:
-                return
-
-            non_null_tile_idxs.remove(index)
-            neighbour_idxs = {
-                self._add(index, (0, 1)),
-                self._add(index, (1, 0)),
-                self._add(index, (1, -1)),
-                self._add(index, (0, -1)),
-                self._add(index, (-1, 0)),
-                self._add(index, (-1, 1)),
-            }
-
-            for neighbour_idx in neighbour_idxs:
-                _expand(neighbour_idx)
+    def items(self) -> Iterator[Tuple[Tuple[int, int], T]]:
+        for x, y in zip(*_numpy().nonzero(self.grid != None)):  # noqa: E711
+            yield (int(x) - self.root[0], int(y) - self.root[1]), self.grid[x, y]
 
-        num_components = 0
-        while len(non_null_tile_idxs) > 0:
-            num_components += 1
-            _expand(non_null_tile_idxs[0])
 
-        return num_components
+class SparseBoard(BaseBoard[T]):
+    """
+    Sparse board backend storing only the occupied cells in a dictionary keyed
+    by their axial coordinates. Writes and deletes never reallocate, and the
+    memory used tracks the number of tiles rather than the bounding box.
+    """
+    def __init__(self):
+        super().__init__()
+        self.cells: MutableMapping[Tuple[int, int], T] = self.new_map()
 
-    def neighbours(self, index: Tuple[int, int]) -> Set[Tuple[Tuple[int, int], T]]:
-        """
-        Returns the neighbours of the specified cell., may be empty.
+    def copy(self) -> "SparseBoard[T]":
+        clone = super().copy()
+        assert isinstance(clone, SparseBoard)
+        clone.cells = copy.copy(self.cells)
+        return clone
 
-        Neighbours are not returned in any order.
-        """
-        neighbour_tiles: Set[Tuple[Tuple[int, int], T]] = set()
-        neighbour_idxs = {
-            self._add(index, (0, 1)),
-            self._add(index, (1, 0)),
-            self._add(index, (1, -1)),
-            self._add(index, (0, -1)),
-            self._add(index, (-1, 0)),
-            self._add(index, (-1, 1)),
-        }
-
-        for neighbour_idx in neighbour_idxs:
-            try:
-                neighbour_tile = self[neighbour_idx]
-            except IndexError:
-                continue
+    def __getitem__(self, index: Tuple[int, int]) -> Optional[T]:
+        return self.cells.get(index)
 
-            if neighbour_tile is not None:
-                neighbour_tiles.add((neighbour_idx, neighbour_tile))
+    def _set(self, index: Tuple[int, int], tile: T):
+        self.cells[index] = tile
 
-        return neighbour_tiles
+    def _delete(self, index: Tuple[int, int]):
+        del self.cells[index]
+
+    def items(self) -> Iterator[Tuple[Tuple[int, int], T]]:
+        return iter(list(self.cells.items()))
+
+
+class PersistentBoard(SparseBoard[T]):
+    """
+    Sparse board backend whose cells and indices are kept in persistent maps,
+    so copy() is O(1) and each write creates O(log n) new nodes, sharing the
+    rest with every copy.
+    """
+    def new_map(self) -> MutableMapping:
+        return hive.persistent.PersistentDict()
@@ -0,0 +1,236 @@
+"""
+An opening book built from a corpus of played games, e.g. the output of
+hive.tournament:
+
+    python -m hive.book games.jsonl --output book.bin
+
+Positions are keyed by their canonical hash (see hive.canonical), so the
+statistics of positions equivalent under symmetry are pooled, and moves are
+stored in the coordinates of the canonical form. The book file holds the
+sorted keys followed by an entry per key, with the move played and how it
+scored for the player making it, and is looked up by binary search straight
+out of a memory map.
+"""
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import argparse
+import json
+import mmap
+import struct
+
+import numpy as np
+
+import hive.board
+import hive.canonical
+import hive.game
+import hive.records
+import hive.tiles
+
+ENTRY_DTYPE = np.dtype([
+    ("tag", "u1"),
+    ("from_x", "<i2"),
+    ("from_y", "<i2"),
+    ("to_x", "<i2"),
+    ("to_y", "<i2"),
+    ("games", "<u4"),
+    ("wins", "<u4"),
+    ("draws", "<u4"),
+])
+
+_MAGIC = b"HIVEBOOK"
+# the magic then the number of entries
+_HEADER = struct.Struct("<8sQ")
+_KEY_DTYPE = np.dtype("<u8")
+
+
+class BookMove(NamedTuple):
+    move: hive.game.Move
+    games: int
+    wins: int
+    draws: int
+
+    @property
+    def score(self) -> float:
+        return (self.wins + 0.5 * self.draws) / self.games
+
+
+def games_from_records(lines: Iterable[str]) -> Iterator[Tuple[List[hive.game.Move], float]]:
+    """
+    Reads the moves and result of each game from hive.tournament records.
+    """
+    for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            yield [hive.records.move_from_json(move) for move in record["moves"]], record["result"]
+
+
+def _tally(
+    games: Iterable[Tuple[Sequence[hive.game.Move], float]],
+    max_plies: int,
+) -> Dict[Tuple[int, tuple], List[int]]:
+    # the games, wins and draws of each move in each canonical position
+    stats: Dict[Tuple[int, tuple], List[int]] = {}
+    for moves, result in games:
+        game = hive.game.Game(hive.board.SparseBoard)
+        for move in moves[:max_plies]:
+            # a symmetric position has several symmetries taking it to its
+            # canonical form, so the move is stored as the smallest of its
+            # images under them, pooling equivalent moves
+            forms = hive.canonical.canonical_forms(game)
+            row = min(hive.records.encode_moves([form.move_to_canonical(move) for form in forms]).tolist())
+            score = result if game.active_player.colour == hive.tiles.Colour.WHITE else 1 - result
+
+            counts = stats.setdefault((forms[0].key, row), [0, 0, 0])
+            counts[0] += 1
+            counts[1] += score == 1
+            counts[2] += score == 0.5
+            game.push(move)
+
+    return stats
+
+
+def build(
+    path: str,
+    games: Iterable[Tuple[Sequence[hive.game.Move], float]],
+    max_plies: int = 16,
+    min_games: int = 1,
+) -> int:
+    """
+    Writes a book of the first max_plies moves of the games, each given as
+    its moves and result (1 for a white win, 0 for a black win and 0.5 for a
+    draw), keeping moves played in at least min_games games. Returns the
+    number of entries written.
+    """
+    stats = sorted(
+        (key, row, counts) for (key, row), counts in _tally(games, max_plies).items() if counts[0] >= min_games
+    )
+
+    keys = np.array([key for key, _, _ in stats], dtype=_KEY_DTYPE)
+    entries = np.array([row + tuple(counts) for _, row, counts in stats], dtype=ENTRY_DTYPE)
+    with open(path, "wb") as file:
+        file.write(_HEADER.pack(_MAGIC, len(keys)))
+        file.write(keys.tobytes())
+        file.write(entries.tobytes())
+
+    return len(stats)
+
+
+class Book:
+    """
+    Reads a book through a memory map, so opening one is cheap however large
+    it is and lookups only touch the pages they search.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._map: Optional[mmap.mmap] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{path} is not an opening book")
+        magic, count = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or len(self._map) != _HEADER.size + count * (_KEY_DTYPE.itemsize + ENTRY_DTYPE.itemsize):
+            raise ValueError(f"{path} is not an opening book")
+
+        self._keys = np.frombuffer(self._map, dtype=_KEY_DTYPE, count=count, offset=_HEADER.size)
+        self._entries = np.frombuffer(
+            self._map, dtype=ENTRY_DTYPE, count=count, offset=_HEADER.size + count * _KEY_DTYPE.itemsize,
+        )
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def lookup(self, game: hive.game.Game) -> List[BookMove]:
+        """
+        Returns the book moves for the position, most played first, in the
+        coordinates of the game.
+        """
+        position = hive.canonical.canonical(game)
+        key = np.uint64(position.key)
+        start = int(np.searchsorted(self._keys, key, side="left"))
+        end = int(np.searchsorted(self._keys, key, side="right"))
+
+        entries = self._entries[start:end]
+        moves = hive.records.decode_moves(entries[["tag", "from_x", "from_y", "to_x", "to_y"]].astype(
+            hive.records.MOVE_DTYPE,
+        ))
+        result = [
+            BookMove(position.move_from_canonical(move), games, wins, draws)
+            for move, (games, wins, draws) in zip(moves, entries[["games", "wins", "draws"]].tolist())
+        ]
+
+        return sorted(result, key=lambda book_move: -book_move.games)
+
+    def choose(self, game: hive.game.Game, min_games: int = 1) -> Optional[hive.game.Move]:
+        """
+        Returns the best scoring legal book move played in at least min_games
+        games, or None when the position is out of book.
+        """
+        candidates = [book_move for book_move in self.lookup(game) if book_move.games >= min_games]
+        if not candidates:
+            return None
+
+        # a colliding key could give moves from some other position
+        legal = game.legal_moves() or [hive.game.Pass()]
+        candidates = [book_move for book_move in candidates if book_move.move in legal]
+        best = max(candidates, key=lambda book_move: (book_move.score, book_move.games), default=None)
+        return None if best is None else best.move
+
+    def close(self):
+        # the views into the map have to go before it can be closed
+        self._keys = np.zeros(0, dtype=_KEY_DTYPE)
+        self._entries = np.zeros(0, dtype=ENTRY_DTYPE)
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __enter__(self) -> "Book":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class BookBot:
+    """
+    Plays book moves while the game is in book, then falls back on the bot.
+    Owns the book, closing it when closed itself.
+    """
+    def __init__(self, bot: Callable[[hive.game.Game], hive.game.Move], book: Book, min_games: int = 1):
+        self.bot = bot
+        self.book = book
+        self.min_games = min_games
+
+    def __call__(self, game: hive.game.Game) -> hive.game.Move:
+        move = self.book.choose(game, self.min_games)
+        return self.bot(game) if move is None else move
+
+    def close(self):
+        self.book.close()
+
+    def __enter__(self) -> "BookBot":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def book_bot(bot: Callable[[hive.game.Game], hive.game.Move], book: Book, min_games: int = 1) -> BookBot:
+    """
+    Plays book moves while the game is in book, then falls back on the bot.
+    """
+    return BookBot(bot, book, min_games)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an opening book from hive.tournament games")
+    parser.add_argument("games", nargs="+", type=argparse.FileType("r"), help="JSON lines files of games")
+    parser.add_argument("--output", required=True, help="path of the book to write")
+    parser.add_argument("--max-plies", type=int, default=16, help="moves of each game to add")
+    parser.add_argument("--min-games", type=int, default=1, help="games a move needs to be kept")
+    args = parser.parse_args()
+
+    games = (game for file in args.games for game in games_from_records(file))
+    count = build(args.output, games, args.max_plies, args.min_games)
+    print(f"Wrote {count} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
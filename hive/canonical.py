@@ -0,0 +1,152 @@
+"""
+Canonical forms of positions under the symmetries of the hex grid. Any two
+positions related by one of the 6 rotations, optionally after a reflection,
+and a translation share the same canonical form and key.
+
+After applying a symmetry, the board is translated so that its smallest cell
+(comparing x then y) sits on the root, which makes the form independent of
+where the first tile was played.
+"""
+from typing import List, NamedTuple, Tuple, Type
+
+import hive.game
+import hive.tiles
+import hive.zobrist
+
+_Cell = Tuple[int, int]
+_TileSpec = Tuple[_Cell, Type[hive.tiles.Tile], hive.tiles.Colour]
+
+
+def _rotate(index: _Cell, turns: int) -> _Cell:
+    # each turn rotates a sixth of the way anticlockwise around the root,
+    # e.g. north to north-west
+    x, y = index
+    for _ in range(turns % 6):
+        x, y = -y, x + y
+
+    return (x, y)
+
+
+class Symmetry(NamedTuple):
+    """
+    A reflection across the line x = y, if reflect is set, followed by a
+    number of anticlockwise sixth turns.
+    """
+    turns: int
+    reflect: bool
+
+    def apply(self, index: _Cell) -> _Cell:
+        if self.reflect:
+            index = (index[1], index[0])
+
+        return _rotate(index, self.turns)
+
+    def invert(self, index: _Cell) -> _Cell:
+        index = _rotate(index, -self.turns)
+        if self.reflect:
+            index = (index[1], index[0])
+
+        return index
+
+
+SYMMETRIES: Tuple[Symmetry, ...] = tuple(Symmetry(turns, reflect) for reflect in (False, True) for turns in range(6))
+
+
+class Canonical(NamedTuple):
+    """
+    The canonical key of a position, along with the symmetry and translation
+    that take the position to its canonical form, so cells and moves can be
+    mapped between the two.
+    """
+    key: int
+    symmetry: Symmetry
+    offset: _Cell
+
+    def to_canonical(self, index: _Cell) -> _Cell:
+        x, y = self.symmetry.apply(index)
+        return (x - self.offset[0], y - self.offset[1])
+
+    def from_canonical(self, index: _Cell) -> _Cell:
+        return self.symmetry.invert((index[0] + self.offset[0], index[1] + self.offset[1]))
+
+    def move_to_canonical(self, move: hive.game.Move) -> hive.game.Move:
+        if isinstance(move, hive.game.Placement):
+            return hive.game.Placement(move.tile_type, self.to_canonical(move.to_index))
+        if isinstance(move, hive.game.Movement):
+            return hive.game.Movement(self.to_canonical(move.from_index), self.to_canonical(move.to_index))
+
+        return move
+
+    def move_from_canonical(self, move: hive.game.Move) -> hive.game.Move:
+        if isinstance(move, hive.game.Placement):
+            return hive.game.Placement(move.tile_type, self.from_canonical(move.to_index))
+        if isinstance(move, hive.game.Movement):
+            return hive.game.Movement(self.from_canonical(move.from_index), self.from_canonical(move.to_index))
+
+        return move
+
+
+def _tiles(game: hive.game.Game) -> List[_TileSpec]:
+    return [(index, type(tile), tile.colour) for index, tile in game.board.items()]
+
+
+def _board_hash(tiles: List[_TileSpec], symmetry: Symmetry) -> Tuple[int, _Cell]:
+    # the hash of the tiles after the symmetry and translation, along with
+    # the translation
+    cells = [symmetry.apply(index) for index, _, _ in tiles]
+    offset = min(cells, default=(0, 0))
+    value = 0
+    for (x, y), (_, tile_type, colour) in zip(cells, tiles):
+        value ^= hive.zobrist.tile_key(tile_type, colour, (x - offset[0], y - offset[1]))
+
+    return value, offset
+
+
+def canonical_forms(game: hive.game.Game) -> List[Canonical]:
+    """
+    Finds the canonical key of the position, which is the smallest zobrist
+    hash of the position over every symmetry. Symmetries and translations
+    don't change the racks or the player to move, so that part of the hash
+    is taken from the game as is.
+
+    Returns a Canonical for every symmetry reaching the canonical form, more
+    than one when the position is symmetric itself, in the order of
+    SYMMETRIES.
+    """
+    tiles = _tiles(game)
+    rest = game.hash
+    for index, tile_type, colour in tiles:
+        rest ^= hive.zobrist.tile_key(tile_type, colour, index)
+
+    forms = []
+    for symmetry in SYMMETRIES:
+        value, offset = _board_hash(tiles, symmetry)
+        forms.append(Canonical(value, symmetry, offset))
+
+    key = min(form.key for form in forms)
+    return [form._replace(key=key ^ rest) for form in forms if form.key == key]
+
+
+def canonical(game: hive.game.Game) -> Canonical:
+    """
+    Returns the first of the canonical forms of the position.
+    """
+    return canonical_forms(game)[0]
+
+
+def canonical_hash(game: hive.game.Game) -> int:
+    return canonical(game).key
+
+
+def canonical_tiles(game: hive.game.Game) -> Tuple[Tuple[_Cell, int, int], ...]:
+    """
+    Returns the tiles of the canonical form, as sorted (cell, kind, colour)
+    tuples. Unlike the key, this can't collide, so can be used to check that
+    positions sharing a key really are the same.
+    """
+    tiles = _tiles(game)
+    result = canonical(game)
+    return tuple(sorted(
+        (result.to_canonical(index), hive.tiles.TILE_KINDS[tile_type], colour.value)
+        for index, tile_type, colour in tiles
+    ))
@@ -0,0 +1,107 @@
+"""
+Encodes positions as fixed-size stacks of feature planes for neural networks,
+written straight into a preallocated batch buffer.
+"""
+from typing import Sequence, Tuple, Type
+import numpy as np
+
+import hive.game
+import hive.tiles
+
+_COLOURS = len(hive.tiles.Colour)
+_KINDS = len(hive.tiles.TILE_TYPES)
+
+
+class Encoder:
+    """
+    Lays out each position as planes of size x size cells centred on the
+    hive, with the cell at the middle of the hive's bounding box in the middle
+    of the planes. In order, the planes are:
+
+    * a plane per tile type, colour and stack height, marking the tiles
+    * a plane filled with 1 when white is to move
+    * a plane per tile type and colour filled with the fraction of those
+      tiles still to be placed
+    * planes marking the cells the player to move may place on, the tiles
+      they may move and the cells those tiles may move to
+
+    The default size fits any hive along with the cells around it. The board
+    doesn't stack tiles yet, so only height 0 is ever marked.
+    """
+    def __init__(self, size: int = 26, heights: int = 1):
+        self.size = size
+        self.heights = heights
+        self.side_plane = _KINDS * _COLOURS * heights
+        self.rack_planes = self.side_plane + 1
+        self.placement_plane = self.rack_planes + _KINDS * _COLOURS
+        self.from_plane = self.placement_plane + 1
+        self.to_plane = self.from_plane + 1
+        self.planes = self.to_plane + 1
+
+    def new_batch(self, count: int) -> np.ndarray:
+        """
+        Allocates a buffer for a batch of encoded positions, to be reused.
+        """
+        return np.zeros((count, self.planes, self.size, self.size), dtype=np.float32)
+
+    def tile_plane(self, tile_type: Type[hive.tiles.Tile], colour: hive.tiles.Colour, height: int = 0) -> int:
+        return (hive.tiles.TILE_KINDS[tile_type] * _COLOURS + colour.value) * self.heights + height
+
+    def origin(self, game: hive.game.Game) -> Tuple[int, int]:
+        """
+        Returns the cell of the board at the corner (0, 0) of the planes.
+        """
+        return self._origin([index for index, _ in game.board.items()])
+
+    def _origin(self, indices: Sequence[Tuple[int, int]]) -> Tuple[int, int]:
+        if not indices:
+            return (-(self.size // 2), -(self.size // 2))
+
+        xs = [x for x, _ in indices]
+        ys = [y for _, y in indices]
+        return ((min(xs) + max(xs)) // 2 - self.size // 2, (min(ys) + max(ys)) // 2 - self.size // 2)
+
+    def _mark(self, out: np.ndarray, plane: int, index: Tuple[int, int], origin: Tuple[int, int]):
+        # sets the cell in the given plane, dropping it if it's off the plane
+        x, y = index[0] - origin[0], index[1] - origin[1]
+        if 0 <= x < self.size and 0 <= y < self.size:
+            out[plane, x, y] = 1
+
+    def encode(self, game: hive.game.Game, out: np.ndarray) -> Tuple[int, int]:
+        """
+        Writes the position into out, a (planes, size, size) slice of a batch
+        from new_batch, returning the origin of the planes. The planes are
+        filled in place, without allocating any arrays of their own.
+        """
+        items = list(game.board.items())
+        origin = self._origin([index for index, _ in items])
+        out.fill(0)
+
+        for index, tile in items:
+            self._mark(out, self.tile_plane(type(tile), tile.colour), index, origin)
+
+        if game.active_player.colour == hive.tiles.Colour.WHITE:
+            out[self.side_plane].fill(1)
+        for player in (game.active_player, game.inactive_player):
+            start = self.rack_planes + player.colour.value * _KINDS
+            for kind, (count, total) in enumerate(zip(player.rack, hive.tiles.TILE_COUNTS)):
+                out[start + kind].fill(count / total)
+
+        for move in game.iter_legal_moves():
+            if isinstance(move, hive.game.Placement):
+                self._mark(out, self.placement_plane, move.to_index, origin)
+            elif isinstance(move, hive.game.Movement):
+                self._mark(out, self.from_plane, move.from_index, origin)
+                self._mark(out, self.to_plane, move.to_index, origin)
+
+        return origin
+
+    def encode_batch(self, games: Sequence[hive.game.Game], out: np.ndarray) -> np.ndarray:
+        """
+        Encodes the games into the start of out, returning the origin of each.
+        """
+        origins = np.empty((len(games), 2), dtype=np.int64)
+        for i, game in enumerate(games):
+            origins[i] = self.encode(game, out[i])
+
+        return origins
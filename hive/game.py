@@ -1,8 +1,12 @@
-from typing import Set, Tuple, Type
+from typing import AbstractSet, Dict, Iterable, Iterator, List, MutableMapping, NamedTuple, Optional, Tuple, Type, Union
+import copy
 import logging
+import random
 
+import hive.analysis
 import hive.board
 import hive.tiles
+import hive.zobrist
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -26,35 +30,172 @@ class InvalidMoveError(HiveError):
     pass
 
 
+class ReplayError(HiveError):
+    pass
+
+
+class Placement(NamedTuple):
+    tile_type: Type[hive.tiles.Tile]
+    to_index: Tuple[int, int]
+
+
+class Movement(NamedTuple):
+    from_index: Tuple[int, int]
+    to_index: Tuple[int, int]
+
+
+class Pass(NamedTuple):
+    """
+    Passing is only legal when the active player has no other legal move.
+    """
+
+
+Move = Union[Placement, Movement, Pass]
+
+# the number of occupied neighbours of a cell by its neighbour occupancy mask
+_NEIGHBOUR_COUNTS = tuple(bin(mask).count("1") for mask in range(64))
+
+
+class _Undo(NamedTuple):
+    # everything that applying the move overwrote
+    move: Move
+    bee_played: bool
+    first_move: bool
+    hash: int
+
+
 class Player:
     def __init__(self, colour: hive.tiles.Colour):
         self.colour = colour
-        self.unused_tiles: Set[hive.tiles.Tile] = {
-            hive.tiles.Bee(colour),
-            hive.tiles.Beetle(colour),
-            hive.tiles.Ant(colour),
-            hive.tiles.Ant(colour),
-            hive.tiles.Ant(colour),
-            hive.tiles.Spider(colour),
-            hive.tiles.Spider(colour),
-            hive.tiles.Spider(colour),
-            hive.tiles.Grasshopper(colour),
-            hive.tiles.Grasshopper(colour),
-            hive.tiles.Grasshopper(colour),
-        }
+        # the number of unused tiles of each type, indexed as TILE_TYPES
+        self.rack: List[int] = list(hive.tiles.TILE_COUNTS)
         self.turn = 0
         self.bee_played = False
 
+    @property
+    def unused_tiles(self) -> List[hive.tiles.Tile]:
+        return [
+            tile_type(self.colour)
+            for tile_type, count in zip(hive.tiles.TILE_TYPES, self.rack)
+            for _ in range(count)
+        ]
+
+    def count(self, tile_type: Type[hive.tiles.Tile]) -> int:
+        return self.rack[hive.tiles.TILE_KINDS[tile_type]]
+
+    def take(self, tile_type: Type[hive.tiles.Tile]) -> hive.tiles.Tile:
+        kind = hive.tiles.TILE_KINDS[tile_type]
+        if self.rack[kind] == 0:
+            raise RuntimeError("No tiles of requested type available.")
+
+        self.rack[kind] -= 1
+        return tile_type(self.colour)
+
+    def give(self, tile: hive.tiles.Tile):
+        self.rack[hive.tiles.TILE_KINDS[type(tile)]] += 1
+
+    def copy(self) -> "Player":
+        clone = copy.copy(self)
+        clone.rack = list(self.rack)
+        return clone
+
     def pretty(self) -> str:
         return ', '.join([str(tile) for tile in self.unused_tiles])
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, board_type: Type[hive.board.BaseBoard] = hive.board.Board):
+        """
+        The board backend may be swapped out, e.g. for hive.board.SparseBoard
+        when many temporary writes are expected or hive.board.PersistentBoard
+        when games are cloned often.
+        """
         self.active_player = Player(hive.tiles.Colour.WHITE)
         self.inactive_player = Player(hive.tiles.Colour.BLACK)
-        self.board = hive.board.Board[hive.tiles.Tile]()
+        self.board: hive.board.BaseBoard[hive.tiles.Tile] = board_type()
         self.first_move = True
+        self._history: List[_Undo] = []
+        # for each colour, the number of tiles of that colour touching each
+        # cell, along with the empty cells that only touch that colour
+        self._touching: Dict[hive.tiles.Colour, MutableMapping[Tuple[int, int], int]] = {
+            colour: self.board.new_map() for colour in hive.tiles.Colour
+        }
+        self._placement_cells: Dict[hive.tiles.Colour, MutableMapping[Tuple[int, int], bool]] = {
+            colour: self.board.new_map() for colour in hive.tiles.Colour
+        }
+        # the cell of each colour's bee once it's on the board, whose
+        # neighbour occupancy the board keeps up to date
+        self._bee_cells: Dict[hive.tiles.Colour, Tuple[int, int]] = {}
+        # analysis of the board shared by everything reading the position,
+        # dropped whenever the board changes
+        self._analysis: Optional[hive.analysis.Analysis] = None
+        # 64-bit zobrist hash of the position, kept up to date by push and pop
+        self.hash = self.compute_hash()
+
+    @classmethod
+    def replay(
+        cls,
+        moves: Iterable[Move],
+        board_type: Type[hive.board.BaseBoard] = hive.board.Board,
+        expected_hash: Optional[int] = None,
+    ) -> "Game":
+        """
+        Rebuilds the game reached by playing the moves from the start, trusting
+        them to be legal, e.g. when they come from our own records. The moves
+        are applied to a plain dict of cells and the board is only built at
+        the end, so they can't be popped afterwards.
+
+        Raises ReplayError when a move doesn't fit the position at all, or
+        when the final hash doesn't match the expected one.
+        """
+        game = cls(board_type)
+        cells: Dict[Tuple[int, int], hive.tiles.Tile] = {}
+        for move in moves:
+            game._replay_move(cells, move)
+
+        for index, tile in cells.items():
+            game._set_tile(index, tile)
+        game.hash = game.compute_hash()
+
+        if expected_hash is not None and game.hash != expected_hash:
+            raise ReplayError(f"Replayed to hash {game.hash:#x} rather than {expected_hash:#x}")
+
+        return game
+
+    def _replay_move(self, cells: Dict[Tuple[int, int], hive.tiles.Tile], move: Move):
+        player = self.active_player
+        if isinstance(move, Placement):
+            if move.to_index in cells or not player.count(move.tile_type):
+                raise ReplayError(f"Cannot replay {move}")
+            cells[move.to_index] = player.take(move.tile_type)
+            if move.tile_type is hive.tiles.Bee:
+                player.bee_played = True
+            self.first_move = False
+        elif isinstance(move, Movement):
+            if move.from_index not in cells or move.to_index in cells:
+                raise ReplayError(f"Cannot replay {move}")
+            cells[move.to_index] = cells.pop(move.from_index)
+
+        player.turn += 1
+        self.active_player, self.inactive_player = self.inactive_player, self.active_player
+
+    def clone(self) -> "Game":
+        """
+        Returns an independent copy of the game, although moves played before
+        cloning can't be popped from the copy. This is O(1) with a
+        hive.board.PersistentBoard, where the copy shares all unchanged
+        structure with the original.
+        """
+        clone = copy.copy(self)
+        clone.active_player = self.active_player.copy()
+        clone.inactive_player = self.inactive_player.copy()
+        clone.board = self.board.copy()
+        clone._history = []
+        clone._analysis = None
+        clone._bee_cells = dict(self._bee_cells)
+        clone._touching = {colour: copy.copy(touching) for colour, touching in self._touching.items()}
+        clone._placement_cells = {colour: copy.copy(cells) for colour, cells in self._placement_cells.items()}
+        return clone
 
     def pretty(self) -> str:
         return (
@@ -67,50 +208,36 @@ class Game:
         if not self.active_player.bee_played:
             raise RuntimeError("Cannot move piece until bee played")
 
-        if self.board[from_index] is None:
+        tile = self.board[from_index]
+        if tile is None:
             raise RuntimeError("Cannot move piece from empty tile")
 
         if self.board[to_index] is not None:
             raise RuntimeError("Cannot move piece to non-empty tile")
 
-        if self.board[from_index].colour != self.active_player.colour:
+        if tile.colour != self.active_player.colour:
             raise RuntimeError("Cannot move opponent's piece")
 
-        tile = self.board[from_index]
-
-        # remove the specified piece from the board and check connected
-        # components
-        del self.board[from_index]
-        is_disconnected = self.board.connected_components() > 1
-        self.board[from_index] = tile
-
-        if is_disconnected:
+        # pinned pieces are those whose removal would split the hive
+        analysis = self.analysis()
+        if from_index in analysis.pinned:
             raise DisconnectedHiveError("Moving tile would disconnect hive")
 
         # TODO(james.gunn): Once all tiles have their valid moves implemented
         # we can swap the order of this check with the above
-        if to_index not in tile.valid_moves(from_index, self.board):
+        if to_index not in analysis.moves(from_index):
             raise InvalidMoveError()
 
-        self.board[to_index] = self.board[from_index]
-        del self.board[from_index]
-
-        # that succeeded, so now switch turns
-        self.active_player.turn += 1
-        self.active_player, self.inactive_player = self.inactive_player, self.active_player
+        self.push(Movement(from_index, to_index))
 
     def _disconnect_check(self, index: Tuple[int, int]):
-        neighbour_count = sum(
-            tile is not None for tile in self.board.neighbours(index)
-        )
-        if neighbour_count == 0:
+        if self.board.occupancy(index) == 0:
             raise RuntimeError("Tile would be disconnected")
 
     def _opposing_color_violation_check(self, index: Tuple[int, int]):
         # check for opposing colour violation
-        for _, neighbour in self.board.neighbours(index):
-            if neighbour.colour != self.active_player.colour:
-                raise RuntimeError("Tile would be touching opposite colour.")
+        if self._touching[self.inactive_player.colour].get(index):
+            raise RuntimeError("Tile would be touching opposite colour.")
 
     def _valid_move_checks(self, tile_type: Type[hive.tiles.Tile], index: Tuple[int, int]):
         if self.first_move and index != (0, 0):
@@ -133,21 +260,238 @@ class Game:
         logger.debug(f"Playing {tile_type} @ {index}")
         self._valid_move_checks(tile_type, index)
 
-        # try and get a tile of the requested type
-        try:
-            tile = next(filter(lambda tile: type(tile) is tile_type, self.active_player.unused_tiles))
-        except StopIteration:
-            raise RuntimeError("No tiles of requested type available.")
-
+        self.push(Placement(tile_type, index))
+
+    def compute_hash(self) -> int:
+        """
+        Computes the zobrist hash of the position from scratch. The hash
+        covers the tiles on the board, the unused tiles of each player and the
+        player to move.
+        """
+        value = 0
+        for index, tile in self.board.items():
+            value ^= hive.zobrist.tile_key(type(tile), tile.colour, index)
+
+        for player in (self.active_player, self.inactive_player):
+            for tile_type in hive.tiles.TILE_TYPES:
+                value ^= hive.zobrist.rack_key(tile_type, player.colour, player.count(tile_type))
+
+        if self.active_player.colour == hive.tiles.Colour.BLACK:
+            value ^= hive.zobrist.SIDE_KEY
+
+        return value
+
+    def _update_placement_cell(self, index: Tuple[int, int]):
+        empty = self.board[index] is None
+        white = self._touching[hive.tiles.Colour.WHITE].get(index, 0)
+        black = self._touching[hive.tiles.Colour.BLACK].get(index, 0)
+        for colour, own, other in (
+            (hive.tiles.Colour.WHITE, white, black),
+            (hive.tiles.Colour.BLACK, black, white),
+        ):
+            cells = self._placement_cells[colour]
+            if empty and own and not other:
+                if index not in cells:
+                    cells[index] = True
+            elif index in cells:
+                del cells[index]
+
+    def _update_touching(self, index: Tuple[int, int], colour: hive.tiles.Colour, delta: int):
+        touching = self._touching[colour]
+        for offset in hive.board.NEIGHBOUR_OFFSETS:
+            neighbour_idx = hive.board.BaseBoard._add(index, offset)
+            count = touching.get(neighbour_idx, 0) + delta
+            if count:
+                touching[neighbour_idx] = count
+            else:
+                del touching[neighbour_idx]
+            self._update_placement_cell(neighbour_idx)
+
+        self._update_placement_cell(index)
+
+    def _set_tile(self, index: Tuple[int, int], tile: hive.tiles.Tile):
+        # all writes to the board go through here and _remove_tile, to keep
+        # the placement cells up to date
         self.board[index] = tile
+        self._analysis = None
+        if type(tile) is hive.tiles.Bee:
+            self._bee_cells[tile.colour] = index
+        self._update_touching(index, tile.colour, 1)
+
+    def _remove_tile(self, index: Tuple[int, int]) -> hive.tiles.Tile:
+        tile = self.board[index]
+        assert tile is not None
+        del self.board[index]
+        self._analysis = None
+        if type(tile) is hive.tiles.Bee:
+            del self._bee_cells[tile.colour]
+        self._update_touching(index, tile.colour, -1)
+        return tile
+
+    def bee_neighbours(self, colour: hive.tiles.Colour) -> int:
+        """
+        Counts the tiles around the bee of the given colour, 0 while it's
+        still to be placed.
+        """
+        index = self._bee_cells.get(colour)
+        return 0 if index is None else _NEIGHBOUR_COUNTS[self.board.occupancy(index)]
+
+    @property
+    def result(self) -> Optional[float]:
+        """
+        Scores a finished game as 1 for a white win, 0 for a black win and 0.5
+        for a draw, when both bees are surrounded at once, or None while the
+        game is still going.
+        """
+        white_lost = self.bee_neighbours(hive.tiles.Colour.WHITE) == 6
+        black_lost = self.bee_neighbours(hive.tiles.Colour.BLACK) == 6
+        if white_lost and black_lost:
+            return 0.5
+        if white_lost:
+            return 0.0
+        if black_lost:
+            return 1.0
+
+        return None
+
+    def placement_cells(self, colour: hive.tiles.Colour) -> AbstractSet[Tuple[int, int]]:
+        """
+        Returns the empty cells touching tiles of the given colour and none of
+        the other, where that colour may place tiles once both players have
+        played their first tile. The returned view tracks later moves.
+        """
+        return self._placement_cells[colour].keys()
+
+    def push(self, move: Move):
+        """
+        Applies the move without validating it, so it should be one of
+        legal_moves() (or a Pass when there are none). The move can be reverted
+        with pop().
+        """
+        player = self.active_player
+        undo = _Undo(move, player.bee_played, self.first_move, self.hash)
+
+        if isinstance(move, Placement):
+            count = player.count(move.tile_type)
+            self._set_tile(move.to_index, player.take(move.tile_type))
+            self.hash ^= (
+                hive.zobrist.rack_key(move.tile_type, player.colour, count) ^
+                hive.zobrist.rack_key(move.tile_type, player.colour, count - 1) ^
+                hive.zobrist.tile_key(move.tile_type, player.colour, move.to_index)
+            )
+            if move.tile_type is hive.tiles.Bee:
+                player.bee_played = True
+            self.first_move = False
+        elif isinstance(move, Movement):
+            moved = self._remove_tile(move.from_index)
+            self._set_tile(move.to_index, moved)
+            self.hash ^= (
+                hive.zobrist.tile_key(type(moved), moved.colour, move.from_index) ^
+                hive.zobrist.tile_key(type(moved), moved.colour, move.to_index)
+            )
+
+        self.hash ^= hive.zobrist.SIDE_KEY
+        self._history.append(undo)
 
-        # that succeeded, so now drop the tile from the user's rack
-        self.active_player.unused_tiles.remove(tile)
-        self.active_player.turn += 1
-        if tile_type is hive.tiles.Bee:
-            self.active_player.bee_played = True
+        # that succeeded, so now switch turns
+        player.turn += 1
+        self.active_player, self.inactive_player = self.inactive_player, self.active_player
+
+    def pop(self) -> Move:
+        """
+        Reverts the last move applied, returning it.
+        """
+        if not self._history:
+            raise RuntimeError("No moves to revert")
+
+        move, bee_played, first_move, self.hash = self._history.pop()
 
-        # and now switch the active and passive player
         self.active_player, self.inactive_player = self.inactive_player, self.active_player
+        player = self.active_player
+        player.turn -= 1
+        player.bee_played = bee_played
+        self.first_move = first_move
+
+        if isinstance(move, Placement):
+            player.give(self._remove_tile(move.to_index))
+        elif isinstance(move, Movement):
+            self._set_tile(move.from_index, self._remove_tile(move.to_index))
+
+        return move
+
+    def _legal_placement_cells(self) -> AbstractSet[Tuple[int, int]]:
+        if self.first_move:
+            return {(0, 0)}
+
+        if self.active_player.turn == 0:
+            # a player's first tile may touch either colour
+            return {
+                index
+                for touching in self._touching.values()
+                for index in touching
+                if self.board[index] is None
+            }
+
+        return self.placement_cells(self.active_player.colour)
+
+    def _placeable_types(self) -> List[Type[hive.tiles.Tile]]:
+        player = self.active_player
+        if not player.bee_played and player.turn >= 2:
+            return [hive.tiles.Bee] if player.count(hive.tiles.Bee) else []
+
+        return [tile_type for tile_type, count in zip(hive.tiles.TILE_TYPES, player.rack) if count]
+
+    def analysis(self) -> hive.analysis.Analysis:
+        """
+        Returns the analysis of the board, shared by every reader of the
+        position until the board next changes.
+        """
+        if self._analysis is None:
+            self._analysis = hive.analysis.Analysis(self.board)
+
+        return self._analysis
+
+    def iter_legal_moves(self) -> Iterator[Move]:
+        """
+        Yields every placement and then every movement available to the active
+        player, only working out the moves of each tile as the iteration
+        reaches it. The game must not change until the iteration is done.
+        """
+        placement_cells = self._legal_placement_cells()
+        for tile_type in self._placeable_types():
+            for index in placement_cells:
+                yield Placement(tile_type, index)
 
-        self.first_move = False
+        if not self.active_player.bee_played:
+            return
+
+        analysis = self.analysis()
+        for from_index in analysis.movable(self.active_player.colour):
+            for to_index in analysis.moves(from_index):
+                yield Movement(from_index, to_index)
+
+    def legal_moves(self) -> List[Move]:
+        """
+        Returns every placement and movement available to the active player.
+        An empty list means the active player has no legal move.
+        """
+        return list(self.iter_legal_moves())
+
+    def must_pass(self) -> bool:
+        """
+        Whether the active player has no legal move, stopping at the first
+        move found.
+        """
+        return next(self.iter_legal_moves(), None) is None
+
+    def random_move(self, rng: random.Random) -> Move:
+        """
+        Picks a legal move uniformly at random by reservoir sampling, without
+        holding every move at once, or Pass when there are none.
+        """
+        choice: Move = Pass()
+        for count, move in enumerate(self.iter_legal_moves(), 1):
+            if rng.random() * count < 1:
+                choice = move
+
+        return choice
@@ -0,0 +1,183 @@
+"""
+Monte Carlo tree search using UCT, searching a single game in place with
+push/pop.
+"""
+from typing import Callable, List, Optional, Sequence
+import math
+import random
+import time
+
+import hive.game
+import hive.tiles
+
+# picks the move to play during a playout from the legal moves available
+PlayoutPolicy = Callable[[hive.game.Game, Sequence[hive.game.Move], random.Random], hive.game.Move]
+
+# the part of a time budget kept back, as a fraction and in ms, since the
+# clock is only checked between plies
+_TIME_MARGIN = 0.1
+_TIME_MARGIN_MS = 1.0
+
+
+def random_policy(
+    game: hive.game.Game,
+    moves: Sequence[hive.game.Move],
+    rng: random.Random,
+) -> hive.game.Move:
+    return rng.choice(moves)
+
+
+def _moves(game: hive.game.Game) -> List[hive.game.Move]:
+    return game.legal_moves() or [hive.game.Pass()]
+
+
+class Node:
+    __slots__ = ("move", "parent", "hash", "colour", "children", "untried", "visits", "reward")
+
+    def __init__(self, move: Optional[hive.game.Move], parent: Optional["Node"], game: hive.game.Game):
+        self.move = move
+        self.parent = parent
+        self.hash = game.hash
+        # the colour that played the move into this node, whose point of view
+        # the reward is from
+        self.colour = game.inactive_player.colour
+        self.children: List[Node] = []
+        # moves not expanded yet, filled in on the first visit
+        self.untried: Optional[List[hive.game.Move]] = None
+        self.visits = 0
+        self.reward = 0.0
+
+    def uct(self, exploration: float, log_parent_visits: float) -> float:
+        return self.reward / self.visits + exploration * math.sqrt(log_parent_visits / self.visits)
+
+
+class MCTS:
+    """
+    An anytime UCT searcher. The tree is kept between searches and reused when
+    the next position searched follows on from the previous one.
+    """
+    def __init__(
+        self,
+        exploration: float = math.sqrt(2),
+        playout_policy: PlayoutPolicy = random_policy,
+        max_playout_length: int = 100,
+        seed: Optional[int] = None,
+    ):
+        self.exploration = exploration
+        self.playout_policy = playout_policy
+        self.max_playout_length = max_playout_length
+        self.rng = random.Random(seed)
+        self.root: Optional[Node] = None
+
+    def _find_root(self, game: hive.game.Game) -> Node:
+        # look for the position within the first couple of plies of the
+        # previous tree, i.e. after our move and the opponent's reply
+        if self.root is not None:
+            candidates = [self.root] + self.root.children
+            candidates += [grandchild for child in self.root.children for grandchild in child.children]
+            for node in candidates:
+                if node.hash == game.hash:
+                    node.parent = None
+                    node.move = None
+                    return node
+
+        return Node(None, None, game)
+
+    def _select(self, game: hive.game.Game, node: Node) -> Node:
+        """
+        Walks down the tree pushing moves, expanding a single new node. Stops
+        early at finished games.
+        """
+        while game.result is None:
+            if node.untried is None:
+                node.untried = _moves(game)
+                self.rng.shuffle(node.untried)
+
+            if node.untried:
+                move = node.untried.pop()
+                game.push(move)
+                child = Node(move, node, game)
+                node.children.append(child)
+                return child
+
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda child: child.uct(self.exploration, log_visits))
+            assert node.move is not None
+            game.push(node.move)
+
+        return node
+
+    def _playout(self, game: hive.game.Game, deadline: Optional[float] = None) -> float:
+        plies = 0
+        result = game.result
+        while result is None and plies < self.max_playout_length:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+            if self.playout_policy is random_policy:
+                # the uniform choice doesn't need the moves gathered up first
+                game.push(game.random_move(self.rng))
+            else:
+                game.push(self.playout_policy(game, _moves(game), self.rng))
+            plies += 1
+            result = game.result
+
+        for _ in range(plies):
+            game.pop()
+
+        # a playout cut short, by its length or the deadline, counts as a draw
+        return 0.5 if result is None else result
+
+    def _iterate(self, game: hive.game.Game, root: Node, deadline: Optional[float] = None):
+        node = self._select(game, root)
+        result = self._playout(game, deadline)
+
+        while node is not root:
+            node.visits += 1
+            node.reward += result if node.colour == hive.tiles.Colour.WHITE else 1 - result
+            assert node.parent is not None
+            node = node.parent
+            game.pop()
+
+        root.visits += 1
+
+    def search(
+        self,
+        game: hive.game.Game,
+        time_ms: Optional[float] = None,
+        max_nodes: Optional[int] = None,
+    ) -> hive.game.Move:
+        """
+        Searches until either budget runs out, returning the most visited move.
+        Playouts stop at the deadline too, so the move comes back on time. The
+        game is left as it was found.
+        """
+        if time_ms is None and max_nodes is None:
+            raise ValueError("A time or node budget is required")
+
+        deadline = None
+        if time_ms is not None:
+            deadline = time.perf_counter() + max(time_ms * (1 - _TIME_MARGIN) - _TIME_MARGIN_MS, 0) / 1000
+        root = self._find_root(game)
+        self.root = root
+
+        if root.untried is None:
+            root.untried = _moves(game)
+            self.rng.shuffle(root.untried)
+        moves = root.untried + [child.move for child in root.children if child.move is not None]
+        if len(moves) == 1:
+            # nothing to think about
+            return moves[0]
+
+        nodes = 0
+        while (max_nodes is None or nodes < max_nodes) and (deadline is None or time.perf_counter() < deadline):
+            self._iterate(game, root, deadline)
+            nodes += 1
+
+        if not root.children:
+            # out of time before doing anything, so play any move
+            return root.untried[-1]
+
+        best = max(root.children, key=lambda child: child.visits)
+        assert best.move is not None
+        return best.move
@@ -0,0 +1,205 @@
+"""
+Perft counts the leaf positions reachable through the legal move generator,
+which checks move generation against known counts and measures its speed.
+
+Run as a script to benchmark the reference positions, e.g.
+
+    python -m hive.perft --depth 2
+"""
+from typing import Callable, Dict, List, Sequence, Tuple, Type
+import argparse
+import time
+
+import hive.board
+import hive.game
+import hive.tiles
+
+W = hive.tiles.Colour.WHITE
+B = hive.tiles.Colour.BLACK
+
+# a tile of the given colour and type at the given cell
+TileSpec = Tuple[hive.tiles.Colour, Type[hive.tiles.Tile], Tuple[int, int]]
+
+
+def perft(game: hive.game.Game, depth: int) -> int:
+    """
+    Counts the positions exactly depth moves on from the current one, where a
+    player with no legal move passes.
+    """
+    if depth == 0:
+        return 1
+
+    moves: Sequence[hive.game.Move] = game.legal_moves() or [hive.game.Pass()]
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        game.push(move)
+        nodes += perft(game, depth - 1)
+        game.pop()
+
+    return nodes
+
+
+def setup(
+    tiles: Sequence[TileSpec],
+    to_move: hive.tiles.Colour = W,
+    board_type: Type[hive.board.BaseBoard] = hive.board.Board,
+) -> hive.game.Game:
+    """
+    Builds a game with the given tiles on the board. The tiles are placed
+    without validation, passing as needed so that each is played by its own
+    colour, so the position need not be reachable from the start.
+    """
+    game = hive.game.Game(board_type)
+    for colour, tile_type, index in tiles:
+        if game.active_player.colour != colour:
+            game.push(hive.game.Pass())
+        game.push(hive.game.Placement(tile_type, index))
+
+    if game.active_player.colour != to_move:
+        game.push(hive.game.Pass())
+
+    return game
+
+
+def _opening() -> List[TileSpec]:
+    return []
+
+
+def _midgame() -> List[TileSpec]:
+    return [
+        (W, hive.tiles.Bee, (0, 0)),
+        (B, hive.tiles.Bee, (0, 1)),
+        (W, hive.tiles.Ant, (1, -1)),
+        (B, hive.tiles.Spider, (-1, 2)),
+        (W, hive.tiles.Spider, (0, -1)),
+        (B, hive.tiles.Ant, (1, 1)),
+        (W, hive.tiles.Grasshopper, (-1, 0)),
+        (B, hive.tiles.Grasshopper, (0, 2)),
+        (W, hive.tiles.Ant, (2, -1)),
+        (B, hive.tiles.Ant, (-1, 1)),
+        (W, hive.tiles.Spider, (1, -2)),
+        (B, hive.tiles.Spider, (1, 2)),
+        (W, hive.tiles.Beetle, (-1, -1)),
+        (B, hive.tiles.Beetle, (-2, 2)),
+    ]
+
+
+def _ant_chain() -> List[TileSpec]:
+    # a long line of tiles with ants at either end and in the middle
+    tiles: List[TileSpec] = [
+        (W, hive.tiles.Ant, (0, -6)),
+        (W, hive.tiles.Spider, (0, -5)),
+        (W, hive.tiles.Spider, (0, -4)),
+        (W, hive.tiles.Grasshopper, (0, -3)),
+        (W, hive.tiles.Ant, (0, -2)),
+        (W, hive.tiles.Bee, (0, -1)),
+        (W, hive.tiles.Ant, (0, 0)),
+        (B, hive.tiles.Ant, (0, 1)),
+        (B, hive.tiles.Bee, (0, 2)),
+        (B, hive.tiles.Ant, (0, 3)),
+        (B, hive.tiles.Grasshopper, (0, 4)),
+        (B, hive.tiles.Spider, (0, 5)),
+        (B, hive.tiles.Spider, (0, 6)),
+        (B, hive.tiles.Ant, (0, 7)),
+    ]
+    return tiles
+
+
+def _ring() -> List[TileSpec]:
+    # the twelve cells two steps from the root, leaving a hole in the middle
+    ring = [(0, 2), (1, 1), (2, 0), (2, -1), (2, -2), (1, -2), (0, -2), (-1, -1), (-2, 0), (-2, 1), (-2, 2), (-1, 2)]
+    tile_types: List[Type[hive.tiles.Tile]] = [
+        hive.tiles.Bee, hive.tiles.Ant, hive.tiles.Spider, hive.tiles.Grasshopper, hive.tiles.Ant, hive.tiles.Spider,
+    ]
+    return [
+        (W if position < 6 else B, tile_types[position % 6], index)
+        for position, index in enumerate(ring)
+    ]
+
+
+def _grasshopper_lines() -> List[TileSpec]:
+    # two crossing lines with grasshoppers at the ends of each
+    return [
+        (W, hive.tiles.Bee, (0, 0)),
+        (W, hive.tiles.Grasshopper, (0, -4)),
+        (W, hive.tiles.Spider, (0, -3)),
+        (W, hive.tiles.Ant, (0, -2)),
+        (W, hive.tiles.Spider, (0, -1)),
+        (W, hive.tiles.Grasshopper, (-4, 0)),
+        (W, hive.tiles.Ant, (-3, 0)),
+        (W, hive.tiles.Spider, (-2, 0)),
+        (W, hive.tiles.Grasshopper, (-1, 0)),
+        (B, hive.tiles.Bee, (0, 1)),
+        (B, hive.tiles.Spider, (0, 2)),
+        (B, hive.tiles.Ant, (0, 3)),
+        (B, hive.tiles.Grasshopper, (0, 4)),
+        (B, hive.tiles.Spider, (1, 0)),
+        (B, hive.tiles.Ant, (2, 0)),
+        (B, hive.tiles.Grasshopper, (3, 0)),
+        (B, hive.tiles.Grasshopper, (4, 0)),
+    ]
+
+
+# the reference positions, white to move in each
+POSITIONS: Dict[str, Callable[[], List[TileSpec]]] = {
+    "opening": _opening,
+    "midgame": _midgame,
+    "ant_chain": _ant_chain,
+    "ring": _ring,
+    "grasshopper_lines": _grasshopper_lines,
+}
+
+BOARD_TYPES: Dict[str, Type[hive.board.BaseBoard]] = {
+    "dense": hive.board.Board,
+    "sparse": hive.board.SparseBoard,
+    "persistent": hive.board.PersistentBoard,
+}
+
+
+def _time(func: Callable[[], int], repeat: int) -> Tuple[int, float]:
+    # returns the count from func along with the best time over the repeats
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = func()
+        best = min(best, time.perf_counter() - start)
+
+    return count, best
+
+
+def _tile_move_generation(game: hive.game.Game) -> int:
+    # calls valid_moves for every tile on the board, regardless of the one
+    # hive rule or whose turn it is
+    return sum(len(tile.valid_moves(index, game.board)) for index, tile in list(game.board.items()))
+
+
+def benchmark(depth: int, repeat: int, positions: Sequence[str], board_types: Sequence[str]):
+    print(f"{'position':<20}{'board':<12}{'nodes':>10}{'perft/s':>12}{'tile moves':>12}{'tile moves/s':>14}")
+    for name in positions:
+        for board_name in board_types:
+            game = setup(POSITIONS[name](), board_type=BOARD_TYPES[board_name])
+            nodes, perft_time = _time(lambda: perft(game, depth), repeat)
+            tile_moves, tile_time = _time(lambda: _tile_move_generation(game), repeat)
+            print(
+                f"{name:<20}{board_name:<12}{nodes:>10}{nodes / perft_time:>12.0f}"
+                f"{tile_moves:>12}{tile_moves / max(tile_time, 1e-9):>14.0f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark move generation over the reference positions")
+    parser.add_argument("--depth", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--position", choices=list(POSITIONS), action="append")
+    parser.add_argument("--board", choices=list(BOARD_TYPES), action="append")
+    args = parser.parse_args()
+
+    benchmark(args.depth, args.repeat, args.position or list(POSITIONS), args.board or list(BOARD_TYPES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+A persistent hash array mapped trie, where every update copies only the path
+from the root to the changed entry and shares the rest of the trie with the
+previous version. This makes copies O(1) and updates O(log n).
+"""
+from typing import Any, Dict, Generic, ItemsView, Iterator, MutableMapping, Optional, Tuple, TypeVar
+import logging
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.DEBUG)
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+
+# marks a missing entry, as None is a valid value
+_MISSING: Any = object()
+
+
+def _hash(key: Any) -> int:
+    return hash(key) & ((1 << _HASH_BITS) - 1)
+
+
+def _popcount(value: int) -> int:
+    return bin(value).count("1")
+
+
+class _Leaf:
+    __slots__ = ("hash", "key", "value")
+
+    def __init__(self, key_hash: int, key: Any, value: Any):
+        self.hash = key_hash
+        self.key = key
+        self.value = value
+
+
+class _Collision:
+    """
+    Holds the leaves whose keys have identical hashes, once every bit of the
+    hash has been used up.
+    """
+    __slots__ = ("leaves",)
+
+    def __init__(self, leaves: Tuple[_Leaf, ...]):
+        self.leaves = leaves
+
+    def get(self, key: Any) -> Any:
+        for leaf in self.leaves:
+            if leaf.key == key:
+                return leaf.value
+
+        return _MISSING
+
+    def set(self, leaf: _Leaf) -> Tuple["_Collision", bool]:
+        others = tuple(other for other in self.leaves if other.key != leaf.key)
+        return _Collision(others + (leaf,)), len(others) == len(self.leaves)
+
+    def delete(self, key: Any) -> Any:
+        leaves = tuple(leaf for leaf in self.leaves if leaf.key != key)
+        if len(leaves) == len(self.leaves):
+            return self
+        if len(leaves) == 1:
+            return leaves[0]
+
+        return _Collision(leaves)
+
+    def __iter__(self) -> Iterator[_Leaf]:
+        return iter(self.leaves)
+
+
+class _Node:
+    """
+    An inner node of the trie. Each level consumes 5 bits of the key's hash,
+    the bitmap records which of the 32 slots are filled and entries holds only
+    the filled slots, each being a _Leaf, _Collision or a child _Node.
+    """
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: Tuple[Any, ...]):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def _slot(self, key_hash: int, shift: int) -> Tuple[int, int]:
+        bit = 1 << ((key_hash >> shift) & _MASK)
+        return bit, _popcount(self.bitmap & (bit - 1))
+
+    def get(self, key_hash: int, key: Any, shift: int) -> Any:
+        bit, position = self._slot(key_hash, shift)
+        if not self.bitmap & bit:
+            return _MISSING
+
+        entry = self.entries[position]
+        if isinstance(entry, _Leaf):
+            return entry.value if entry.key == key else _MISSING
+        if isinstance(entry, _Collision):
+            return entry.get(key)
+
+        return entry.get(key_hash, key, shift + _BITS)
+
+    def set(self, leaf: _Leaf, shift: int) -> Tuple["_Node", bool]:
+        """
+        Returns the updated node, along with whether the key was added rather
+        than replaced.
+        """
+        bit, position = self._slot(leaf.hash, shift)
+        if not self.bitmap & bit:
+            entries = self.entries[:position] + (leaf,) + self.entries[position:]
+            return _Node(self.bitmap | bit, entries), True
+
+        entry = self.entries[position]
+        replacement: Any
+        if isinstance(entry, _Leaf) and entry.key == leaf.key:
+            replacement, added = leaf, False
+        elif isinstance(entry, _Leaf):
+            replacement, added = _merge(entry, leaf, shift + _BITS), True
+        elif isinstance(entry, _Collision):
+            replacement, added = entry.set(leaf)
+        else:
+            replacement, added = entry.set(leaf, shift + _BITS)
+
+        entries = self.entries[:position] + (replacement,) + self.entries[position + 1:]
+        return _Node(self.bitmap, entries), added
+
+    def delete(self, key_hash: int, key: Any, shift: int) -> Any:
+        """
+        Returns the updated entry, which is this node when the key is missing,
+        None when the node is now empty or a lone leaf that can be pulled up
+        into the parent.
+        """
+        bit, position = self._slot(key_hash, shift)
+        if not self.bitmap & bit:
+            return self
+
+        entry = self.entries[position]
+        if isinstance(entry, _Leaf):
+            replacement = None if entry.key == key else entry
+        elif isinstance(entry, _Collision):
+            replacement = entry.delete(key)
+        else:
+            replacement = entry.delete(key_hash, key, shift + _BITS)
+
+        if replacement is entry:
+            return self
+
+        return self._replace(bit, position, replacement, shift)
+
+    def _replace(self, bit: int, position: int, replacement: Any, shift: int) -> Any:
+        if replacement is None:
+            entries = self.entries[:position] + self.entries[position + 1:]
+            bitmap = self.bitmap & ~bit
+        else:
+            entries = self.entries[:position] + (replacement,) + self.entries[position + 1:]
+            bitmap = self.bitmap
+
+        # collapse nodes holding a single leaf, other than the root. Collisions
+        # stay put, as they must only hold keys with identical hashes
+        if shift > 0 and len(entries) == 1 and isinstance(entries[0], _Leaf):
+            return entries[0]
+        if shift > 0 and not entries:
+            return None
+
+        return _Node(bitmap, entries)
+
+    def __iter__(self) -> Iterator[_Leaf]:
+        for entry in self.entries:
+            if isinstance(entry, _Leaf):
+                yield entry
+            else:
+                yield from entry
+
+
+def _merge(first: _Leaf, second: _Leaf, shift: int) -> Any:
+    # builds the smallest subtree holding two leaves whose hashes match up to
+    # the given shift
+    if shift >= _HASH_BITS:
+        return _Collision((first, second))
+
+    first_slot = (first.hash >> shift) & _MASK
+    second_slot = (second.hash >> shift) & _MASK
+    if first_slot == second_slot:
+        return _Node(1 << first_slot, (_merge(first, second, shift + _BITS),))
+    if first_slot > second_slot:
+        first, second = second, first
+
+    return _Node((1 << first_slot) | (1 << second_slot), (first, second))
+
+
+_EMPTY = _Node(0, ())
+
+
+class PersistentDict(MutableMapping[K, V], Generic[K, V]):
+    """
+    A mutable mapping backed by a persistent trie. Mutating it swaps in a new
+    version of the trie, sharing all but O(log n) nodes with the old one, so
+    copy() is O(1) and copies never see each other's changes.
+    """
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, items: Optional[Dict[K, V]] = None):
+        self._root = _EMPTY
+        self._size = 0
+        if items:
+            self.update(items)
+
+    def __getitem__(self, key: K) -> V:
+        value = self._root.get(_hash(key), key, 0)
+        if value is _MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def get(self, key: K, default: Any = None) -> Any:
+        value = self._root.get(_hash(key), key, 0)
+        return default if value is _MISSING else value
+
+    def __contains__(self, key: object) -> bool:
+        return self._root.get(_hash(key), key, 0) is not _MISSING
+
+    def __setitem__(self, key: K, value: V):
+        self._root, added = self._root.set(_Leaf(_hash(key), key, value), 0)
+        self._size += added
+
+    def __delitem__(self, key: K):
+        root = self._root.delete(_hash(key), key, 0)
+        if root is self._root:
+            raise KeyError(key)
+
+        self._root = root
+        self._size -= 1
+
+    def __iter__(self) -> Iterator[K]:
+        return (leaf.key for leaf in self._root)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def items(self) -> ItemsView[K, V]:
+        return _ItemsView(self)
+
+    def copy(self) -> "PersistentDict[K, V]":
+        clone: PersistentDict[K, V] = PersistentDict()
+        clone._root = self._root
+        clone._size = self._size
+        return clone
+
+    __copy__ = copy
+
+    def __repr__(self) -> str:
+        return f"PersistentDict({dict(self.items())!r})"
+
+
+class _ItemsView(ItemsView[K, V]):
+    _mapping: PersistentDict[K, V]
+
+    def __iter__(self) -> Iterator[Tuple[K, V]]:
+        # walk the trie directly, rather than looking up each key again
+        return ((leaf.key, leaf.value) for leaf in self._mapping._root)
@@ -0,0 +1,190 @@
+"""
+A compact binary format for game records. Every move takes a fixed 9 bytes,
+a tag followed by the cells moved from and to as little-endian 16-bit axial
+coordinates. The tag is 0 for a pass, 1 + the tile kind for a placement (see
+hive.tiles.TILE_KINDS) and MOVEMENT for a movement.
+
+An archive holds many games one after another, followed by an index of where
+each game starts, so any game can be read in O(1) straight out of a memory
+map.
+
+Moves also have a plain JSON form, used by hive.tournament's game records.
+"""
+from typing import Any, BinaryIO, Iterable, Iterator, List, Optional, Sequence
+import mmap
+import struct
+
+import numpy as np
+
+import hive.game
+import hive.tiles
+
+PASS = 0
+MOVEMENT = 1 + len(hive.tiles.TILE_TYPES)
+
+MOVE_DTYPE = np.dtype([
+    ("tag", "u1"),
+    ("from_x", "<i2"),
+    ("from_y", "<i2"),
+    ("to_x", "<i2"),
+    ("to_y", "<i2"),
+])
+
+# the range of the 16-bit coordinates
+_COORDINATE_MIN = -(1 << 15)
+_COORDINATE_MAX = (1 << 15) - 1
+
+_MAGIC = b"HIVEREC1"
+# the offset of the index and the number of games, then the magic again
+_FOOTER = struct.Struct("<QQ8s")
+_OFFSET_DTYPE = np.dtype("<u8")
+
+
+_TILE_NAMES = {tile_type.__name__: tile_type for tile_type in hive.tiles.TILE_TYPES}
+
+
+def move_to_json(move: hive.game.Move) -> List[Any]:
+    if isinstance(move, hive.game.Placement):
+        return ["place", move.tile_type.__name__, list(move.to_index)]
+    if isinstance(move, hive.game.Movement):
+        return ["move", list(move.from_index), list(move.to_index)]
+
+    return ["pass"]
+
+
+def move_from_json(data: Sequence[Any]) -> hive.game.Move:
+    if data[0] == "place":
+        return hive.game.Placement(_TILE_NAMES[data[1]], (data[2][0], data[2][1]))
+    if data[0] == "move":
+        return hive.game.Movement((data[1][0], data[1][1]), (data[2][0], data[2][1]))
+    if data[0] == "pass":
+        return hive.game.Pass()
+
+    raise ValueError(f"Unknown move {data!r}")
+
+
+def encode_moves(moves: Sequence[hive.game.Move]) -> np.ndarray:
+    rows = []
+    for move in moves:
+        if isinstance(move, hive.game.Placement):
+            rows.append((1 + hive.tiles.TILE_KINDS[move.tile_type], 0, 0) + move.to_index)
+        elif isinstance(move, hive.game.Movement):
+            rows.append((MOVEMENT,) + move.from_index + move.to_index)
+        else:
+            rows.append((PASS, 0, 0, 0, 0))
+
+        # checked up front, as older numpy silently wraps out of range values
+        if not all(_COORDINATE_MIN <= coordinate <= _COORDINATE_MAX for coordinate in rows[-1][1:]):
+            raise ValueError(f"{move} is outside of the range of the format")
+
+    return np.array(rows, dtype=MOVE_DTYPE)
+
+
+def decode_moves(records: np.ndarray) -> List[hive.game.Move]:
+    moves: List[hive.game.Move] = []
+    for tag, from_x, from_y, to_x, to_y in records.tolist():
+        if tag == PASS:
+            moves.append(hive.game.Pass())
+        elif tag == MOVEMENT:
+            moves.append(hive.game.Movement((from_x, from_y), (to_x, to_y)))
+        elif tag < MOVEMENT:
+            moves.append(hive.game.Placement(hive.tiles.TILE_TYPES[tag - 1], (to_x, to_y)))
+        else:
+            raise ValueError(f"Unknown move tag {tag}")
+
+    return moves
+
+
+class ArchiveWriter:
+    """
+    Streams games out to an archive, writing the index when closed.
+    """
+    def __init__(self, path: str):
+        self._file: BinaryIO = open(path, "wb")
+        self._file.write(_MAGIC)
+        # the start of each game, counted in moves
+        self._offsets = [0]
+
+    def add(self, moves: Sequence[hive.game.Move]):
+        self._file.write(encode_moves(moves).tobytes())
+        self._offsets.append(self._offsets[-1] + len(moves))
+
+    def close(self):
+        if self._file.closed:
+            return
+
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._offsets, dtype=_OFFSET_DTYPE).tobytes())
+        self._file.write(_FOOTER.pack(index_offset, len(self._offsets) - 1, _MAGIC))
+        self._file.close()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def write_archive(path: str, games: Iterable[Sequence[hive.game.Move]]):
+    with ArchiveWriter(path) as writer:
+        for moves in games:
+            writer.add(moves)
+
+
+class Archive:
+    """
+    Reads games out of an archive through a memory map. The records of a game
+    are returned as a view of the map, so scanning them doesn't copy.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._map: Optional[mmap.mmap] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._map) < len(_MAGIC) + _FOOTER.size or self._map[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a game archive")
+        index_offset, count, magic = _FOOTER.unpack_from(self._map, len(self._map) - _FOOTER.size)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a game archive")
+
+        self._offsets = np.frombuffer(self._map, dtype=_OFFSET_DTYPE, count=count + 1, offset=index_offset)
+        self._moves = np.frombuffer(
+            self._map, dtype=MOVE_DTYPE, count=int(self._offsets[-1]), offset=len(_MAGIC),
+        )
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def records(self, game: int) -> np.ndarray:
+        """
+        Returns the records of a game as a view of the map, which stays valid
+        after the archive is closed.
+        """
+        if not 0 <= game < len(self):
+            raise IndexError(f"Game {game} is not in the archive")
+
+        return self._moves[self._offsets[game]:self._offsets[game + 1]]
+
+    def __getitem__(self, game: int) -> List[hive.game.Move]:
+        return decode_moves(self.records(game))
+
+    def __iter__(self) -> Iterator[List[hive.game.Move]]:
+        return (self[game] for game in range(len(self)))
+
+    def close(self):
+        # the views into the map have to go before it can be closed
+        self._offsets = np.zeros(1, dtype=_OFFSET_DTYPE)
+        self._moves = np.zeros(0, dtype=MOVE_DTYPE)
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # records handed out still point into the map, which is then
+                # unmapped once the last of them is freed
+                pass
+            self._map = None
+
+    def __enter__(self) -> "Archive":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
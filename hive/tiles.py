@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Set, Tuple
+from typing import Dict, Set, Tuple, Type
 import logging
 
 import hive.board
@@ -14,9 +14,31 @@ class Colour(Enum):
 
 
 class Tile:
+    """
+    Tiles carry no state beyond their type and colour, so they are flyweights:
+    constructing a tile returns the one shared instance for that type and
+    colour. Subclasses must declare empty __slots__ to stay compact.
+    """
+    __slots__ = ("colour",)
+
+    _instances: Dict[Tuple[type, Colour], "Tile"] = {}
+
+    def __new__(cls, colour: Colour):
+        tile = Tile._instances.get((cls, colour))
+        if tile is None:
+            tile = super().__new__(cls)
+            tile.colour = colour
+            Tile._instances[(cls, colour)] = tile
+
+        return tile
+
     def __init__(self, colour: Colour):
         self.colour = colour
 
+    def __reduce__(self):
+        # unpickle (and copy) to the shared instance
+        return type(self), (self.colour,)
+
     def _emoji(self) -> str:
         raise NotImplementedError()
 
@@ -27,75 +49,13 @@ class Tile:
     def _add(left: Tuple[int, int], right: Tuple[int, int]):
         return (left[0] + right[0], left[1] + right[1])
 
-    @staticmethod
-    def _subtract(left: Tuple[int, int], right: Tuple[int, int]):
-        return (left[0] - right[0], left[1] - right[1])
-
-    @staticmethod
-    def _relative_idx(position: int) -> Tuple[int, int]:
-        if position == 0:
-            return (0, 1)
-        elif position == 1:
-            return (1, 0)
-        elif position == 2:
-            return (1, -1)
-        elif position == 3:
-            return (0, -1)
-        elif position == 4:
-            return (-1, 0)
-        elif position == 5:
-            return (-1, 1)
-
-        raise ValueError()
-
-    @staticmethod
-    def _position(index: Tuple[int, int]) -> int:
-        if index == (0, 1):
-            return 0
-        elif index == (1, 0):
-            return 1
-        elif index == (1, -1):
-            return 2
-        elif index == (0, -1):
-            return 3
-        elif index == (-1, 0):
-            return 4
-        elif index == (-1, 1):
-            return 5
-
-        raise ValueError()
-
-    def _check_step(self, index: Tuple[int, int], board: hive.board.Board) -> Set[Tuple[int, int]]:
+    def _check_step(self, index: Tuple[int, int], board: hive.board.BaseBoard) -> Set[Tuple[int, int]]:
         """
         Finds moves that take a single step from the given index
         """
-        valid_moves = set()
-        neighbours = board.neighbours(index)
-        relative_idxs = [self._subtract(neighbour_idx, index) for neighbour_idx, _ in neighbours]
-
-        def check_single_move(relative_idx: Tuple[int, int]):
-            position = self._position(relative_idx)
-            if (
-                self._relative_idx((position + 1) % 6) not in relative_idxs and
-                self._relative_idx((position + 2) % 6) not in relative_idxs
-            ):
-                valid_moves.add(
-                    self._add(index, self._relative_idx((position + 1) % 6))
-                )
-            if (
-                self._relative_idx((position - 1) % 6) not in relative_idxs and
-                self._relative_idx((position - 2) % 6) not in relative_idxs
-            ):
-                valid_moves.add(
-                    self._add(index, self._relative_idx((position - 1) % 6))
-                )
-
-        for relative_idx in relative_idxs:
-            check_single_move(relative_idx)
-
-        return valid_moves
+        return set(board.slides(index))
 
-    def valid_moves(self, index: Tuple[int, int], board: hive.board.Board) -> Set[Tuple[int, int]]:
+    def valid_moves(self, index: Tuple[int, int], board: hive.board.BaseBoard) -> Set[Tuple[int, int]]:
         """
         Takes in the board and the current position of this tile and returns the possible destination indices of this
         tile.
@@ -104,77 +64,77 @@ class Tile:
 
 
 class Bee(Tile):
+    __slots__ = ()
+
     def _emoji(self) -> str:
         return "🐝"
 
-    def valid_moves(self, index: Tuple[int, int], board: hive.board.Board) -> Set[Tuple[int, int]]:
+    def valid_moves(self, index: Tuple[int, int], board: hive.board.BaseBoard) -> Set[Tuple[int, int]]:
         return self._check_step(index, board)
 
 
 class Spider(Tile):
+    __slots__ = ()
+
     def _emoji(self) -> str:
         return "🕷️"
 
-    def valid_moves(self, index: Tuple[int, int], board: hive.board.Board) -> Set[Tuple[int, int]]:
-        # temporarily remove tile from the board
-        tmp = board[index]
-        del board[index]
-
-        valid_moves_1 = self._check_step(index, board)
-        # explicitly name the empty set to keep mypy happy
-        empty_set: Set[Tuple[int, int]] = set()
-        valid_moves_2 = empty_set.union(*map(
-            lambda index: self._check_step(index, board),
-            valid_moves_1
-        )) - {index}
-        valid_moves_3 = empty_set.union(*map(
-            lambda index: self._check_step(index, board),
-            valid_moves_2
-        )) - valid_moves_1
-
-        board[index] = tmp
+    def valid_moves(self, index: Tuple[int, int], board: hive.board.BaseBoard) -> Set[Tuple[int, int]]:
+        # follow every path of exactly three slides that never revisits a
+        # cell, treating the spider's own cell as empty rather than removing
+        # it from the board
+        valid_moves: Set[Tuple[int, int]] = set()
+        for first in board.slides(index, index):
+            for second in board.slides(first, index):
+                if second == index:
+                    continue
+                for third in board.slides(second, index):
+                    if third != index and third != first:
+                        valid_moves.add(third)
 
-        return valid_moves_3
+        return valid_moves
 
 
 class Ant(Tile):
+    __slots__ = ()
+
     def _emoji(self) -> str:
         return "🐜"
 
-    def valid_moves(self, index: Tuple[int, int], board: hive.board.Board) -> Set[Tuple[int, int]]:
-        # temporarily remove tile from the board
-        tmp = board[index]
-        del board[index]
+    def valid_moves(self, index: Tuple[int, int], board: hive.board.BaseBoard) -> Set[Tuple[int, int]]:
+        # a single search over the sliding graph, treating the ant's own cell
+        # as empty rather than removing it from the board
+        visited = {index}
+        frontier = [index]
+        while frontier:
+            for step in board.slides(frontier.pop(), index):
+                if step not in visited:
+                    visited.add(step)
+                    frontier.append(step)
 
-        # explicitly name the empty set to keep mypy happy
-        empty_set: Set[Tuple[int, int]] = set()
-
-        valid_moves: Set[Tuple[int, int]] = set()
-        new_moves = {index}
-        while new_moves:
-            next_moves = empty_set.union(*map(
-                lambda index: self._check_step(index, board),
-                new_moves
-            ))
-            # always subtract off the original index to ensure we don't
-            # include it in any move set
-            new_moves = next_moves - valid_moves - {index}
-            valid_moves = valid_moves.union(new_moves)
-
-        board[index] = tmp
-        return valid_moves
+        visited.remove(index)
+        return visited
 
 
 class Beetle(Tile):
+    __slots__ = ()
+
     def _emoji(self) -> str:
         return "Beetle"
 
+    def valid_moves(self, index: Tuple[int, int], board: hive.board.BaseBoard) -> Set[Tuple[int, int]]:
+        # beetles only move on the ground, a single step around the hive,
+        # until the board supports stacking
+        return self._check_step(index, board)
+
 
 class Grasshopper(Tile):
+    __slots__ = ()
+
     def _emoji(self) -> str:
         return "🦗"
 
-    def valid_moves(self, index: Tuple[int, int], board: hive.board.Board) -> Set[Tuple[int, int]]:
+    def valid_moves(self, index: Tuple[int, int], board: hive.board.BaseBoard) -> Set[Tuple[int, int]]:
         valid_moves: Set[Tuple[int, int]] = set()
 
         def maybe_add_in_direction(direction: Tuple[int, int]):
@@ -196,3 +156,12 @@ class Grasshopper(Tile):
         maybe_add_in_direction((-1, 1))
 
         return valid_moves
+
+
+# every type of tile, in a fixed order, along with the number of each that a
+# player starts with
+TILE_TYPES: Tuple[Type[Tile], ...] = (Bee, Beetle, Ant, Spider, Grasshopper)
+TILE_COUNTS: Tuple[int, ...] = (1, 1, 3, 3, 3)
+
+# the position of each type of tile within TILE_TYPES
+TILE_KINDS: Dict[Type[Tile], int] = {tile_type: kind for kind, tile_type in enumerate(TILE_TYPES)}
@@ -0,0 +1,284 @@
+"""
+Plays games between bots across a pool of processes, streaming each finished
+game to a JSON lines file and reporting Elo ratings, e.g.
+
+    python -m hive.tournament --games 20 --bot random --bot mcts:max_nodes=200 --output games.jsonl
+
+Workers are only sent small game specs and only send back plain records, so
+no Game or Board is ever pickled between processes.
+"""
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+import argparse
+import collections
+import contextlib
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+import hive.alphabeta
+import hive.book
+import hive.game
+import hive.mcts
+import hive.perft
+import hive.records
+import hive.tiles
+
+# picks a move for the player to move, leaving the game as it was found
+Bot = Callable[[hive.game.Game], hive.game.Move]
+
+
+def _random_bot(seed: int) -> Bot:
+    rng = random.Random(seed)
+    return lambda game: game.random_move(rng)
+
+
+def _mcts_bot(seed: int, time_ms: Optional[float] = None, max_nodes: Optional[int] = None, **kwargs: Any) -> Bot:
+    searcher = hive.mcts.MCTS(seed=seed, **kwargs)
+    return lambda game: searcher.search(game, time_ms=time_ms, max_nodes=max_nodes)
+
+
+def _alphabeta_bot(
+    seed: int,
+    max_depth: Optional[int] = None,
+    time_ms: Optional[float] = None,
+    **kwargs: Any,
+) -> Bot:
+    searcher = hive.alphabeta.AlphaBeta(**kwargs)
+    return lambda game: searcher.search(game, max_depth=max_depth, time_ms=time_ms).move
+
+
+BOTS: Dict[str, Callable[..., Bot]] = {
+    "random": _random_bot,
+    "mcts": _mcts_bot,
+    "alphabeta": _alphabeta_bot,
+}
+
+
+def _parse_value(value: str) -> Union[int, float, str]:
+    for parse in (int, float):
+        try:
+            return parse(value)
+        except ValueError:
+            pass
+
+    return value
+
+
+# the arguments limiting how long a bot searches, which have to be positive
+_BUDGETS = ("time_ms", "max_nodes", "max_depth")
+
+
+def parse_spec(spec: str) -> Tuple[str, Dict[str, Union[int, float, str]]]:
+    """
+    Splits a bot spec into the bot's name and keyword arguments, checking the
+    name is known and any budgets are positive.
+    """
+    name, _, arguments = spec.partition(":")
+    if name not in BOTS:
+        raise ValueError(f"Unknown bot {name!r}, expected one of {', '.join(BOTS)}")
+
+    kwargs = {}
+    for argument in filter(None, arguments.split(",")):
+        key, _, value = argument.partition("=")
+        kwargs[key] = _parse_value(value)
+
+    for key in _BUDGETS:
+        budget = kwargs.get(key)
+        if budget is not None and (isinstance(budget, str) or budget <= 0):
+            raise ValueError(f"{key} of {spec!r} must be a positive number")
+
+    return name, kwargs
+
+
+def make_bot(spec: str, seed: int) -> Bot:
+    """
+    Builds a bot from a spec of its name and optional keyword arguments, e.g.
+    "mcts:max_nodes=500,exploration=1.0". Any bot can be given an opening
+    book to play from first with book=path (see hive.book), in which case the
+    bot holds the book open until it's closed.
+    """
+    name, kwargs = parse_spec(spec)
+    book_path = kwargs.pop("book", None)
+    bot = BOTS[name](seed, **kwargs)
+    if book_path is None:
+        return bot
+
+    return hive.book.book_bot(bot, hive.book.Book(str(book_path)))
+
+
+class GameSpec(NamedTuple):
+    game_id: int
+    white: str
+    black: str
+    seed: int
+    max_moves: int
+    board: str
+
+
+def play(spec: GameSpec) -> Dict[str, Any]:
+    """
+    Plays out a single game, scored as 1 for a white win, 0 for a black win
+    and 0.5 for a draw, including games reaching the move limit.
+    """
+    game = hive.game.Game(board_type=hive.perft.BOARD_TYPES[spec.board])
+    moves: List[List[Any]] = []
+    times: List[float] = []
+    result = game.result
+    with contextlib.ExitStack() as stack:
+        bots = {
+            hive.tiles.Colour.WHITE: make_bot(spec.white, spec.seed),
+            hive.tiles.Colour.BLACK: make_bot(spec.black, spec.seed + 1),
+        }
+        for bot in bots.values():
+            if isinstance(bot, hive.book.BookBot):
+                stack.enter_context(bot)
+
+        while result is None and len(moves) < spec.max_moves:
+            start = time.perf_counter()
+            move = bots[game.active_player.colour](game)
+            times.append(time.perf_counter() - start)
+            game.push(move)
+            moves.append(hive.records.move_to_json(move))
+            result = game.result
+
+    return {
+        "game": spec.game_id,
+        "white": spec.white,
+        "black": spec.black,
+        "seed": spec.seed,
+        "result": 0.5 if result is None else result,
+        "moves": moves,
+        "times": times,
+    }
+
+
+def schedule(
+    bots: Sequence[str],
+    games: int,
+    seed: int = 0,
+    max_moves: int = 200,
+    board: str = "dense",
+) -> List[GameSpec]:
+    """
+    Pairs every bot against every other for the given number of games,
+    alternating colours, or against itself when there's only one bot.
+    """
+    pairs = list(itertools.combinations(bots, 2)) or [(bots[0], bots[0])]
+    specs: List[GameSpec] = []
+    for first, second in pairs:
+        for game in range(games):
+            white, black = (second, first) if game % 2 else (first, second)
+            game_id = len(specs)
+            specs.append(GameSpec(game_id, white, black, seed + 2 * game_id, max_moves, board))
+
+    return specs
+
+
+def run(
+    specs: Sequence[GameSpec],
+    processes: Optional[int] = None,
+    output: Optional[IO[str]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Plays the games across a pool of processes, yielding and writing out
+    each one as soon as it finishes.
+    """
+    with multiprocessing.Pool(processes) as pool:
+        for record in pool.imap_unordered(play, specs):
+            if output is not None:
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+            yield record
+
+
+def elo_ratings(records: Iterable[Dict[str, Any]], iterations: int = 200) -> Dict[str, float]:
+    """
+    Fits Bradley-Terry strengths to the results by minorisation-maximisation
+    and converts them to Elo ratings averaging 0. Each pairing gets a virtual
+    draw so bots that never scored still get a finite rating.
+    """
+    points: Dict[str, float] = collections.defaultdict(float)
+    games: Dict[Tuple[str, str], float] = collections.defaultdict(float)
+    for record in records:
+        white, black = record["white"], record["black"]
+        if white == black:
+            continue
+        points[white] += record["result"]
+        points[black] += 1 - record["result"]
+        games[white, black] += 1
+        games[black, white] += 1
+
+    for white, black in list(games):
+        points[white] += 0.5
+        games[white, black] += 1
+
+    strengths = {bot: 1.0 for bot in points}
+    if not strengths:
+        return {}
+
+    for _ in range(iterations):
+        for bot in strengths:
+            strengths[bot] = points[bot] / sum(
+                count / (strengths[bot] + strengths[other]) for (player, other), count in games.items() if player == bot
+            )
+        mean = sum(math.log(strength) for strength in strengths.values()) / len(strengths)
+        strengths = {bot: strength / math.exp(mean) for bot, strength in strengths.items()}
+
+    return {bot: 400 * math.log10(strength) for bot, strength in strengths.items()}
+
+
+def report(records: Sequence[Dict[str, Any]], out: IO[str] = sys.stdout):
+    scores: Dict[str, List[float]] = collections.defaultdict(list)
+    for record in records:
+        scores[record["white"]].append(record["result"])
+        scores[record["black"]].append(1 - record["result"])
+
+    ratings = elo_ratings(records)
+    out.write(f"{'bot':<40}{'games':>8}{'score':>8}{'elo':>8}\n")
+    for bot in sorted(scores, key=lambda bot: -ratings.get(bot, 0)):
+        out.write(f"{bot:<40}{len(scores[bot]):>8}{sum(scores[bot]):>8.1f}{ratings.get(bot, 0):>8.0f}\n")
+
+    move_times = [move_time for record in records for move_time in record["times"]]
+    if move_times:
+        average = 1000 * sum(move_times) / len(move_times)
+        out.write(f"\n{len(records)} games, {len(move_times)} moves, {average:.1f}ms/move\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play games between bots and report Elo ratings")
+    parser.add_argument(
+        "--bot", action="append", required=True, help=f"one of {', '.join(BOTS)}, e.g. mcts:max_nodes=200",
+    )
+    parser.add_argument("--games", type=int, default=10, help="games per pairing")
+    parser.add_argument("--processes", type=int, default=None, help="defaults to the number of cores")
+    parser.add_argument("--max-moves", type=int, default=200, help="moves before a game counts as a draw")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--board", choices=list(hive.perft.BOARD_TYPES), default="dense")
+    parser.add_argument("--output", type=argparse.FileType("w"), default=None, help="JSON lines file of games")
+    args = parser.parse_args()
+
+    for spec in args.bot:
+        # fail fast on bad specs, rather than in every worker
+        try:
+            parse_spec(spec)
+        except ValueError as error:
+            parser.error(str(error))
+        bot = make_bot(spec, args.seed)
+        if isinstance(bot, hive.book.BookBot):
+            bot.close()
+
+    specs = schedule(args.bot, args.games, args.seed, args.max_moves, args.board)
+    records = []
+    for record in run(specs, args.processes, args.output):
+        records.append(record)
+        print(f"game {record['game']}: {record['white']} v {record['black']} {record['result']}", file=sys.stderr)
+
+    report(records)
+
+
+if __name__ == "__main__":
+    main()
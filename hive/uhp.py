@@ -0,0 +1,292 @@
+"""
+An engine speaking the Universal Hive Protocol over stdin and stdout, e.g.
+
+    python -m hive.uhp
+
+The engine keeps a single game (and search tables) warm between commands.
+Pieces are named as in UHP, e.g. wQ for the white bee and bA2 for the second
+black ant placed, and moves are written relative to a neighbouring piece.
+UHP draws hexes pointy side up, so our directions are turned by 30 degrees,
+with north becoming UHP's north-east and so on clockwise.
+"""
+from typing import TYPE_CHECKING, Dict, IO, List, Optional, Tuple, Type
+import re
+import sys
+
+import hive.board
+import hive.game
+import hive.tiles
+
+if TYPE_CHECKING:
+    import hive.alphabeta
+
+ENGINE_ID = "id hive"
+
+_COLOURS = {"w": hive.tiles.Colour.WHITE, "b": hive.tiles.Colour.BLACK}
+_LETTERS = {
+    hive.tiles.Bee: "Q",
+    hive.tiles.Beetle: "B",
+    hive.tiles.Ant: "A",
+    hive.tiles.Spider: "S",
+    hive.tiles.Grasshopper: "G",
+}
+_TILE_TYPES = {letter: tile_type for tile_type, letter in _LETTERS.items()}
+
+_PIECE = re.compile(r"^([wb])([QBASG])(\d?)$")
+_REFERENCE = re.compile(r"^([-/\\]?)([wb][QBASG]\d?)([-/\\]?)$")
+
+# how the cell in each of our directions (see hive.board.NEIGHBOUR_OFFSETS)
+# from a reference piece is written, in the same clockwise order
+_DIRECTIONS = ("{}/", "{}-", "{}\\", "/{}", "-{}", "\\{}")
+_DIRECTION_MARKS = {
+    (prefix, suffix): position
+    for position, direction in enumerate(_DIRECTIONS)
+    for prefix, suffix in [direction.split("{}")]
+}
+
+
+class UHPError(Exception):
+    pass
+
+
+class InvalidMove(UHPError):
+    pass
+
+
+def _piece_name(colour: hive.tiles.Colour, tile_type: Type[hive.tiles.Tile], number: int) -> str:
+    prefix = "w" if colour == hive.tiles.Colour.WHITE else "b"
+    # there is only one bee, which goes without a number
+    if tile_type is hive.tiles.Bee:
+        return f"{prefix}Q"
+
+    return f"{prefix}{_LETTERS[tile_type]}{number}"
+
+
+class Engine:
+    def __init__(self):
+        self.game = hive.game.Game(hive.board.SparseBoard)
+        # the name of the piece on each cell and the moves played, along
+        # with the strings they were played as
+        self.names: Dict[Tuple[int, int], str] = {}
+        self.moves: List[str] = []
+        self._searcher: Optional["hive.alphabeta.AlphaBeta"] = None
+
+    def new_game(self):
+        self.game = hive.game.Game(hive.board.SparseBoard)
+        self.names = {}
+        self.moves = []
+
+    def _cell_of(self, name: str) -> Optional[Tuple[int, int]]:
+        for index, other in self.names.items():
+            if other == name:
+                return index
+
+        return None
+
+    def _next_name(self, tile_type: Type[hive.tiles.Tile]) -> str:
+        colour = self.game.active_player.colour
+        number = hive.tiles.TILE_COUNTS[hive.tiles.TILE_KINDS[tile_type]] - self.game.active_player.count(tile_type)
+        return _piece_name(colour, tile_type, number + 1)
+
+    def _state(self) -> str:
+        result = self.game.result
+        if result is None:
+            return "InProgress" if self.moves else "NotStarted"
+
+        return {1.0: "WhiteWins", 0.0: "BlackWins"}.get(result, "Draw")
+
+    def game_string(self) -> str:
+        colour = "White" if self.game.active_player.colour == hive.tiles.Colour.WHITE else "Black"
+        turn = len(self.moves) // 2 + 1
+        return ";".join([f"Base;{self._state()};{colour}[{turn}]"] + self.moves)
+
+    def parse_move(self, text: str) -> hive.game.Move:
+        """
+        Converts a move string into a move for the current position, which
+        isn't necessarily legal.
+        """
+        if text.strip().lower() == "pass":
+            return hive.game.Pass()
+
+        parts = text.split()
+        piece = _PIECE.match(parts[0]) if parts else None
+        if piece is None or len(parts) > 2:
+            raise UHPError(f"Cannot parse move {text!r}")
+
+        if len(parts) == 1:
+            if self.names:
+                raise InvalidMove(f"{text} needs a piece to be played next to")
+            to_index = (0, 0)
+        else:
+            to_index = self._parse_destination(parts[1])
+
+        from_index = self._cell_of(parts[0])
+        if from_index is not None:
+            return hive.game.Movement(from_index, to_index)
+
+        tile_type = _TILE_TYPES[piece.group(2)]
+        if _COLOURS[piece.group(1)] != self.game.active_player.colour or parts[0] != self._next_name(tile_type):
+            raise InvalidMove(f"{parts[0]} cannot be placed now")
+
+        return hive.game.Placement(tile_type, to_index)
+
+    def _parse_destination(self, text: str) -> Tuple[int, int]:
+        reference = _REFERENCE.match(text)
+        if reference is None:
+            raise UHPError(f"Cannot parse position {text!r}")
+
+        prefix, name, suffix = reference.groups()
+        if not prefix and not suffix:
+            raise InvalidMove("Stacking pieces is not supported")
+        if (prefix, suffix) not in _DIRECTION_MARKS:
+            raise UHPError(f"Cannot parse position {text!r}")
+
+        reference_index = self._cell_of(name)
+        if reference_index is None:
+            raise InvalidMove(f"{name} is not on the board")
+
+        offset = hive.board.NEIGHBOUR_OFFSETS[_DIRECTION_MARKS[prefix, suffix]]
+        return hive.board.BaseBoard._add(reference_index, offset)
+
+    def format_move(self, move: hive.game.Move) -> str:
+        if isinstance(move, hive.game.Pass):
+            return "pass"
+
+        if isinstance(move, hive.game.Placement):
+            name = self._next_name(move.tile_type)
+            from_index = None
+        else:
+            name = self.names[move.from_index]
+            from_index = move.from_index
+
+        for position, offset in enumerate(hive.board.NEIGHBOUR_OFFSETS):
+            # the destination in terms of a neighbour of it, other than the
+            # piece being moved
+            reference_index = hive.board.BaseBoard._add(move.to_index, offset)
+            if reference_index in self.names and reference_index != from_index:
+                direction = _DIRECTIONS[(position + 3) % 6]
+                return f"{name} {direction.format(self.names[reference_index])}"
+
+        # only the very first piece has no neighbours
+        return name
+
+    def valid_moves(self) -> List[hive.game.Move]:
+        if self.game.result is not None:
+            return []
+
+        return self.game.legal_moves() or [hive.game.Pass()]
+
+    def play(self, text: str):
+        if self.game.result is not None:
+            raise InvalidMove("The game is over")
+
+        move = self.parse_move(text)
+        if move not in self.valid_moves():
+            raise InvalidMove(f"{text} is not a valid move")
+
+        move_string = self.format_move(move)
+        self.game.push(move)
+        if isinstance(move, hive.game.Placement):
+            self.names[move.to_index] = move_string.split()[0]
+        elif isinstance(move, hive.game.Movement):
+            self.names[move.to_index] = self.names.pop(move.from_index)
+        self.moves.append(move_string)
+
+    def undo(self, count: int = 1):
+        if not 0 < count <= len(self.moves):
+            raise UHPError(f"Cannot undo {count} moves")
+
+        for _ in range(count):
+            move = self.game.pop()
+            self.moves.pop()
+            if isinstance(move, hive.game.Placement):
+                del self.names[move.to_index]
+            elif isinstance(move, hive.game.Movement):
+                self.names[move.from_index] = self.names.pop(move.to_index)
+
+    def best_move(self, arguments: List[str]) -> str:
+        # the searcher is imported and created on first use, keeping its
+        # table between moves
+        import hive.alphabeta
+
+        if self._searcher is None:
+            self._searcher = hive.alphabeta.AlphaBeta()
+        if self.game.result is not None:
+            raise UHPError("The game is over")
+
+        if len(arguments) == 2 and arguments[0] == "depth" and arguments[1].isdigit():
+            result = self._searcher.search(self.game, max_depth=int(arguments[1]))
+        elif len(arguments) == 2 and arguments[0] == "time":
+            hours, minutes, seconds = (int(part) for part in arguments[1].split(":"))
+            result = self._searcher.search(self.game, time_ms=1000 * (3600 * hours + 60 * minutes + seconds))
+        else:
+            raise UHPError("bestmove takes either time hh:mm:ss or depth n")
+
+        return self.format_move(result.move)
+
+    def _new_game(self, arguments: List[str]) -> str:
+        text = " ".join(arguments)
+        fields = text.split(";")
+        if text and fields[0] != "Base":
+            raise UHPError(f"Unsupported game type {fields[0]}")
+
+        self.new_game()
+        for move in fields[3:]:
+            self.play(move)
+
+        return self.game_string()
+
+    def handle(self, line: str) -> str:
+        """
+        Runs a single command, returning its output without the closing ok.
+        """
+        command, *arguments = line.split(" ")
+        if command == "info":
+            return f"{ENGINE_ID}\n"
+        if command == "newgame":
+            return self._new_game(arguments)
+        if command in ("play", "pass"):
+            self.play(" ".join(arguments) if command == "play" else "pass")
+            return self.game_string()
+        if command == "validmoves":
+            return ";".join(self.format_move(move) for move in self.valid_moves())
+        if command == "bestmove":
+            return self.best_move(arguments)
+        if command == "undo":
+            if arguments and not arguments[0].isdigit():
+                raise UHPError(f"Cannot undo {arguments[0]} moves")
+            self.undo(int(arguments[0]) if arguments else 1)
+            return self.game_string()
+        if command == "options":
+            return ""
+
+        raise UHPError(f"Unknown command {command}")
+
+    def respond(self, line: str) -> str:
+        try:
+            output = self.handle(line)
+        except InvalidMove as error:
+            output = f"invalidmove {error}"
+        except (UHPError, ValueError) as error:
+            output = f"err {error}"
+
+        return f"{output}\nok" if output else "ok"
+
+    def run(self, stdin: IO[str], stdout: IO[str]):
+        stdout.write(self.respond("info") + "\n")
+        stdout.flush()
+        for line in stdin:
+            line = line.strip()
+            if line == "exit":
+                break
+            if line:
+                stdout.write(self.respond(line) + "\n")
+                stdout.flush()
+
+
+def main():
+    Engine().run(sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Keys for hashing game positions, combined with xor so that a position hash can
+be updated incrementally as tiles are placed and moved.
+
+The board is unbounded, so rather than a table of random numbers each key is
+derived by mixing its packed fields. This keeps the keys identical across
+processes and runs, so hashes can be stored alongside games.
+"""
+from typing import Dict, Tuple, Type
+import functools
+
+import hive.tiles
+
+_MASK = (1 << 64) - 1
+
+_TILE_DOMAIN = 1
+_RACK_DOMAIN = 2
+_SIDE_DOMAIN = 3
+
+
+def _mix(value: int) -> int:
+    # the splitmix64 finaliser, which spreads the packed fields across all of
+    # the bits of the key
+    value = (value + 0x9E3779B97F4A7C15) & _MASK
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK
+    return value ^ (value >> 31)
+
+
+def _key(*fields: int) -> int:
+    value = 0
+    for field in fields:
+        value = _mix(value ^ (field & _MASK))
+
+    return value
+
+
+# the cells of a game stay near the root, so a bounded cache of the most
+# recent tile keys holds nearly all of those looked up
+_TILE_CACHE_SIZE = 1 << 16
+
+
+@functools.lru_cache(maxsize=_TILE_CACHE_SIZE)
+def _tile_key(kind: int, colour: int, height: int, x: int, y: int) -> int:
+    return _key(_TILE_DOMAIN, kind, colour, height, x, y)
+
+
+def tile_key(
+    tile_type: Type[hive.tiles.Tile],
+    colour: hive.tiles.Colour,
+    index: Tuple[int, int],
+    height: int = 0,
+) -> int:
+    """
+    Key for a tile of the given type and colour sitting at the cell, height
+    counts the number of tiles beneath it.
+    """
+    return _tile_key(hive.tiles.TILE_KINDS[tile_type], colour.value, height, index[0], index[1])
+
+
+# a rack never holds more of a tile type than the game has, so every rack key
+# is worked out up front
+_RACK_KEYS: Dict[Tuple[Type[hive.tiles.Tile], hive.tiles.Colour, int], int] = {
+    (tile_type, colour, count): _key(_RACK_DOMAIN, hive.tiles.TILE_KINDS[tile_type], colour.value, count)
+    for tile_type, total in zip(hive.tiles.TILE_TYPES, hive.tiles.TILE_COUNTS)
+    for colour in hive.tiles.Colour
+    for count in range(total + 1)
+}
+
+
+def rack_key(tile_type: Type[hive.tiles.Tile], colour: hive.tiles.Colour, count: int) -> int:
+    """
+    Key for a player having exactly count unused tiles of the given type.
+    """
+    value = _RACK_KEYS.get((tile_type, colour, count))
+    if value is None:
+        value = _key(_RACK_DOMAIN, hive.tiles.TILE_KINDS[tile_type], colour.value, count)
+
+    return value
+
+
+# toggled whenever black is the player to move
+SIDE_KEY = _key(_SIDE_DOMAIN)
@@ -0,0 +1,82 @@
+"""
+Games and positions shared between the tests.
+"""
+from typing import Callable, List, Sequence, Tuple, Type
+import random
+
+import hive.board
+import hive.game
+import hive.perft
+import hive.tiles
+
+W = hive.tiles.Colour.WHITE
+B = hive.tiles.Colour.BLACK
+
+
+def play(moves: Sequence[hive.game.Move], board_type: Type[hive.board.BaseBoard] = hive.board.Board) -> hive.game.Game:
+    game = hive.game.Game(board_type)
+    for move in moves:
+        game.push(move)
+
+    return game
+
+
+def random_moves(
+    seed: int,
+    plies: int,
+    board_type: Type[hive.board.BaseBoard] = hive.board.Board,
+) -> List[hive.game.Move]:
+    """
+    Plays uniformly random legal moves from the start, passing when there are
+    none, returning the moves played.
+    """
+    rng = random.Random(seed)
+    game = hive.game.Game(board_type)
+    moves = []
+    for _ in range(plies):
+        move = rng.choice(game.legal_moves() or [hive.game.Pass()])
+        game.push(move)
+        moves.append(move)
+
+    return moves
+
+
+def random_game(
+    seed: int,
+    plies: int,
+    board_type: Type[hive.board.BaseBoard] = hive.board.Board,
+) -> hive.game.Game:
+    return play(random_moves(seed, plies, board_type), board_type)
+
+
+def map_moves(
+    moves: Sequence[hive.game.Move],
+    mapping: Callable[[Tuple[int, int]], Tuple[int, int]],
+) -> List[hive.game.Move]:
+    """
+    Returns the moves with every cell mapped, e.g. by one of the symmetries.
+    """
+    result: List[hive.game.Move] = []
+    for move in moves:
+        if isinstance(move, hive.game.Placement):
+            result.append(hive.game.Placement(move.tile_type, mapping(move.to_index)))
+        elif isinstance(move, hive.game.Movement):
+            result.append(hive.game.Movement(mapping(move.from_index), mapping(move.to_index)))
+        else:
+            result.append(move)
+
+    return result
+
+
+def winning_position() -> hive.game.Game:
+    # the black bee is surrounded apart from (-1, 1), which the white ant can
+    # reach by sliding around the hive
+    return hive.perft.setup([
+        (B, hive.tiles.Bee, (0, 0)),
+        (W, hive.tiles.Bee, (0, 1)),
+        (W, hive.tiles.Spider, (1, 0)),
+        (W, hive.tiles.Spider, (1, -1)),
+        (W, hive.tiles.Grasshopper, (0, -1)),
+        (W, hive.tiles.Grasshopper, (-1, 0)),
+        (W, hive.tiles.Ant, (0, 2)),
+    ])
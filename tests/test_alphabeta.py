@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+import hive.alphabeta
+import hive.game
+import hive.perft
+import tests.helpers
+
+
+def _minimax(game: hive.game.Game, depth: int, ply: int = 0) -> int:
+    # plain negamax without pruning or the table, to check the search against
+    leaf_score = hive.alphabeta._leaf_score(game, depth, ply)
+    if leaf_score is not None:
+        return leaf_score
+
+    best = -hive.alphabeta.WIN - 1
+    for move in game.legal_moves() or [hive.game.Pass()]:
+        game.push(move)
+        best = max(best, -_minimax(game, depth - 1, ply + 1))
+        game.pop()
+
+    return best
+
+
+def test_search_requires_budget():
+    with pytest.raises(ValueError):
+        hive.alphabeta.AlphaBeta().search(hive.game.Game())
+
+
+def test_search_finds_win():
+    result = hive.alphabeta.AlphaBeta().search(tests.helpers.winning_position(), max_depth=3)
+
+    assert result.move == hive.game.Movement((0, 2), (-1, 1))
+    assert result.score == hive.alphabeta.WIN - 1
+    # the win is found on the first iteration, so there's no need to go deeper
+    assert result.depth == 1
+
+
+def test_search_finished_game():
+    searcher = hive.alphabeta.AlphaBeta()
+    game = tests.helpers.winning_position()
+    searcher.search(game, max_depth=2)
+
+    game.push(hive.game.Movement((0, 2), (-1, 1)))
+    result = searcher.search(game, max_depth=2)
+
+    # black to move with its bee surrounded, so no move from the last search
+    assert result == hive.alphabeta.SearchResult(hive.game.Pass(), -hive.alphabeta.WIN, 0, 0)
+    assert hive.alphabeta.AlphaBeta().search(game, max_depth=2) == result
+
+
+@pytest.mark.parametrize("position", ["opening", "ant_chain", "grasshopper_lines"])
+def test_search_matches_minimax(position):
+    game = hive.perft.setup(hive.perft.POSITIONS[position]())
+    hash_before = game.hash
+
+    result = hive.alphabeta.AlphaBeta().search(game, max_depth=2)
+
+    assert result.depth == 2
+    assert result.score == _minimax(game, 2)
+    assert result.move in game.legal_moves()
+    assert game.hash == hash_before
+
+
+@pytest.mark.parametrize("time_ms, min_depth", [(5, 0), (100, 1)])
+def test_search_respects_time_budget(time_ms, min_depth):
+    game = hive.perft.setup(hive.perft.POSITIONS["ring"]())
+    searcher = hive.alphabeta.AlphaBeta()
+
+    start = time.perf_counter()
+    result = searcher.search(game, time_ms=time_ms)
+
+    # the clock is read at every node, so at most a node runs over
+    assert time.perf_counter() - start < 1.5 * time_ms / 1000 + 0.01
+    assert result.depth >= min_depth
+    assert result.move in game.legal_moves()
+    assert game.hash == game.compute_hash()
+
+
+def test_table_is_bounded():
+    searcher = hive.alphabeta.AlphaBeta(table_size=8)
+
+    searcher.search(hive.perft.setup(hive.perft.POSITIONS["ant_chain"]()), max_depth=2)
+
+    assert len(searcher.table.slots) == 8
+    assert all(entry is not None for entry in searcher.table.slots)
+
+
+def test_table_replacement():
+    table = hive.alphabeta.TranspositionTable(4)
+    table.store(1, 3, 10, hive.alphabeta.EXACT, None)
+
+    # a shallower entry doesn't replace a deeper one from the same search
+    table.store(5, 1, 20, hive.alphabeta.EXACT, None)
+    assert table.probe(5) is None
+    assert table.probe(1).score == 10
+
+    # but anything replaces entries from an earlier search
+    table.new_search()
+    table.store(5, 1, 20, hive.alphabeta.EXACT, None)
+    assert table.probe(1) is None
+    assert table.probe(5).score == 20
+
+
+def test_evaluate():
+    game = tests.helpers.winning_position()
+
+    # white to move, with five tiles around black's bee and three around
+    # white's, where the only pinned tile is white's bee, which isn't counted
+    assert hive.alphabeta.evaluate(game) == 100 * (5 - 3)
+
+    game.push(hive.game.Movement((0, 2), (-1, 1)))
+    # black to move, with its bee surrounded and nothing pinned in the ring
+    assert hive.alphabeta.evaluate(game) == 100 * (3 - 6)
@@ -0,0 +1,44 @@
+import hive.analysis
+import hive.board
+import hive.game
+import hive.tiles
+import tests.helpers
+
+
+def test_structures():
+    board = hive.board.SparseBoard()
+    for index in [(0, 0), (0, 1), (0, 2)]:
+        board[index] = hive.tiles.Ant(hive.tiles.Colour.WHITE)
+
+    analysis = hive.analysis.Analysis(board)
+
+    assert analysis.pinned == {(0, 1)}
+    # the ant can reach every cell still touching the hive once it's lifted
+    assert analysis.moves((0, 0)) == {(1, 0), (1, 1), (1, 2), (0, 3), (-1, 3), (-1, 2), (-1, 1)}
+    assert analysis.movable(hive.tiles.Colour.WHITE) == [(0, 0), (0, 2)]
+    assert analysis.movable(hive.tiles.Colour.BLACK) == []
+
+
+def test_moves_match_legal_moves():
+    for seed in range(5):
+        game = tests.helpers.random_game(seed, 20)
+        movements = [move for move in game.legal_moves() if isinstance(move, hive.game.Movement)]
+
+        if game.active_player.bee_played:
+            analysis = game.analysis()
+            movable = analysis.movable(game.active_player.colour)
+            assert sum(len(analysis.moves(index)) for index in movable) == len(movements)
+
+
+def test_game_shares_analysis_until_board_changes():
+    game = tests.helpers.random_game(0, 10)
+
+    analysis = game.analysis()
+    assert game.analysis() is analysis
+
+    game.push(hive.game.Pass())
+    assert game.analysis() is analysis
+
+    game.push(game.legal_moves()[0])
+    assert game.analysis() is not analysis
+    assert game.clone().analysis() is not game.analysis()
@@ -0,0 +1,155 @@
+import numpy as np
+import pytest
+
+import hive.batch
+import hive.board
+import hive.game
+import hive.perft
+import hive.tiles
+import tests.helpers
+
+W = hive.tiles.Colour.WHITE
+B = hive.tiles.Colour.BLACK
+
+
+def _played_move(before: hive.batch.BatchGame, after: hive.batch.BatchGame) -> hive.game.Move:
+    # works out the move played in the first game of the batch from the cells
+    # that changed
+    emptied = [before._to_index(x, y) for x, y in zip(*np.nonzero((after.owners[0] == -1) & (before.owners[0] != -1)))]
+    filled = [before._to_index(x, y) for x, y in zip(*np.nonzero((after.owners[0] != -1) & (before.owners[0] == -1)))]
+    if emptied:
+        return hive.game.Movement(emptied[0], filled[0])
+    if filled:
+        x, y = before._to_cell(filled[0])
+        return hive.game.Placement(hive.tiles.TILE_TYPES[after.kinds[0, x, y]], filled[0])
+
+    return hive.game.Pass()
+
+
+def _assert_same(batch: hive.batch.BatchGame, game: hive.game.Game):
+    expected = hive.batch.BatchGame.from_game(game, 1, batch.size)
+    for name in ("kinds", "owners", "racks", "turns", "to_move", "first_move"):
+        np.testing.assert_array_equal(getattr(batch, name)[:1], getattr(expected, name), err_msg=name)
+
+
+def test_opening_moves():
+    batch = hive.batch.BatchGame(3)
+
+    assert set(batch.legal_moves(2)) == set(hive.game.Game().legal_moves())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_moves_covered(seed):
+    game = tests.helpers.random_game(seed, 30, hive.board.SparseBoard)
+    legal = set(game.legal_moves())
+    batch = hive.batch.BatchGame.from_game(game, 2)
+    moves = set(batch.legal_moves(1))
+
+    assert moves <= legal
+    # every placement is covered
+    assert {move for move in moves if isinstance(move, hive.game.Placement)} == {
+        move for move in legal if isinstance(move, hive.game.Placement)
+    }
+    # as are the moves of bees, beetles and grasshoppers whose neighbours
+    # stay connected
+    single_run = {
+        move for move in legal
+        if isinstance(move, hive.game.Movement) and
+        type(game.board[move.from_index]) in (hive.tiles.Bee, hive.tiles.Beetle, hive.tiles.Grasshopper) and
+        hive.board.RUNS[game.board.occupancy(move.from_index)] == 1
+    }
+    assert single_run <= moves
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_step_matches_game(seed):
+    batch = hive.batch.BatchGame(4, seed=seed)
+    game = hive.game.Game(board_type=hive.board.SparseBoard)
+
+    for _ in range(60):
+        if not np.isnan(batch.results[0]):
+            break
+
+        covered = batch.legal_moves(0)
+        before = hive.batch.BatchGame.from_game(game, 1, batch.size)
+        batch.step()
+        move = _played_move(before, batch)
+
+        if isinstance(move, hive.game.Pass):
+            assert covered == []
+        else:
+            assert move in covered
+            assert move in game.legal_moves()
+        game.push(move)
+        _assert_same(batch, game)
+
+
+def test_results():
+    game = hive.perft.setup([
+        (B, hive.tiles.Bee, (0, 0)),
+        (W, hive.tiles.Bee, (0, 1)),
+        (W, hive.tiles.Spider, (1, 0)),
+        (W, hive.tiles.Spider, (1, -1)),
+        (W, hive.tiles.Grasshopper, (0, -1)),
+        (W, hive.tiles.Grasshopper, (-1, 0)),
+        (W, hive.tiles.Ant, (0, 2)),
+    ])
+    batch = hive.batch.BatchGame.from_game(game, 2)
+    assert np.isnan(batch.results).all()
+
+    game.push(hive.game.Movement((0, 2), (-1, 1)))
+    batch = hive.batch.BatchGame.from_game(game, 2)
+    np.testing.assert_array_equal(batch.results, [1.0, 1.0])
+    # finished games don't move
+    batch.step()
+    _assert_same(batch, game)
+
+
+def test_playout():
+    batch = hive.batch.BatchGame(50, seed=0)
+
+    results = batch.playout(max_plies=60)
+
+    assert set(results) <= {0.0, 0.5, 1.0}
+    assert (batch.turns.sum(axis=1) <= 60).all()
+
+
+def test_from_game_too_small():
+    game = tests.helpers.random_game(0, 20, hive.board.SparseBoard)
+
+    with pytest.raises(ValueError):
+        hive.batch.BatchGame.from_game(game, 1, size=4)
+
+
+def test_falls_back_when_no_move_is_covered():
+    white = [
+        ((-3, 4), hive.tiles.Spider), ((-3, 5), hive.tiles.Grasshopper), ((-3, 6), hive.tiles.Ant),
+        ((-2, 2), hive.tiles.Ant), ((-2, 3), hive.tiles.Ant), ((-1, 0), hive.tiles.Spider),
+        ((-1, 1), hive.tiles.Grasshopper), ((0, -1), hive.tiles.Bee), ((1, -2), hive.tiles.Grasshopper),
+        ((2, -4), hive.tiles.Spider), ((2, -3), hive.tiles.Beetle),
+    ]
+    black = [
+        ((-3, 7), hive.tiles.Grasshopper), ((-2, 0), hive.tiles.Grasshopper), ((0, 1), hive.tiles.Ant),
+        ((1, 0), hive.tiles.Bee), ((2, 0), hive.tiles.Grasshopper), ((2, 1), hive.tiles.Ant),
+        ((2, 2), hive.tiles.Spider), ((3, -2), hive.tiles.Spider), ((3, -1), hive.tiles.Beetle),
+        ((3, 0), hive.tiles.Ant), ((3, 1), hive.tiles.Spider),
+    ]
+    game = hive.game.Game(board_type=hive.board.SparseBoard)
+    for (white_index, white_type), (black_index, black_type) in zip(white, black):
+        game.push(hive.game.Placement(white_type, white_index))
+        game.push(hive.game.Placement(black_type, black_index))
+
+    # only white's spider at (2, -4) can move, which the batch doesn't cover
+    legal = game.legal_moves()
+    assert {move.from_index for move in legal} == {(2, -4)}
+    batch = hive.batch.BatchGame.from_game(game, 4, seed=0)
+    assert batch.legal_moves(0) == []
+    assert set(batch.to_game(0).legal_moves()) == set(legal)
+
+    before = hive.batch.BatchGame.from_game(game, 4)
+    batch.step()
+
+    assert _played_move(before, batch) in legal
+    x, y = batch._to_cell((2, -4))
+    assert (batch.owners[:, x, y] == -1).all()
+    assert (batch.to_move == 1).all()
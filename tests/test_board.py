@@ -1,12 +1,25 @@
+from typing import Type
+import random
+
+import pytest
+
 import hive.board
 
+board_types = pytest.mark.parametrize("board_type", [
+    hive.board.Board,
+    hive.board.SparseBoard,
+    hive.board.PersistentBoard,
+])
 
-def test_create_board():
-    hive.board.Board()
 
+@board_types
+def test_create_board(board_type: Type[hive.board.BaseBoard]):
+    board_type()
 
-def test_set_and_get():
-    board = hive.board.Board()
+
+@board_types
+def test_set_and_get(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
     board[(3, 2)] = "a"
     board[(1, -2)] = "b"
     board[(0, 0)] = "c"
@@ -20,8 +33,9 @@ def test_set_and_get():
     assert board[(-7, 1)] == "e"
 
 
-def test_neighbours():
-    board = hive.board.Board()
+@board_types
+def test_neighbours(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
     a = (3, 3)
     b = (3, 4)
     c = (4, 3)
@@ -41,22 +55,25 @@ def test_neighbours():
     assert board.neighbours((1, 5)) == set()
 
 
-def test_connected_components_a():
-    board = hive.board.Board()
+@board_types
+def test_connected_components_a(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
 
     assert board.connected_components() == 0
 
 
-def test_connected_components_b():
-    board = hive.board.Board()
+@board_types
+def test_connected_components_b(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
 
     board[(0, 0)] = "a"
 
     assert board.connected_components() == 1
 
 
-def test_connected_components_c():
-    board = hive.board.Board()
+@board_types
+def test_connected_components_c(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
 
     board[(0, 0)] = "a"
     board[(1, 1)] = "b"
@@ -64,8 +81,9 @@ def test_connected_components_c():
     assert board.connected_components() == 2
 
 
-def test_connected_components_d():
-    board = hive.board.Board()
+@board_types
+def test_connected_components_d(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
 
     board[(0, 0)] = "a"
     board[(1, 1)] = "b"
@@ -74,8 +92,9 @@ def test_connected_components_d():
     assert board.connected_components() == 1
 
 
-def test_connected_components_e():
-    board = hive.board.Board()
+@board_types
+def test_connected_components_e(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
 
     # add a circle of tiles
     board[(0, 0)] = "a"
@@ -86,3 +105,204 @@ def test_connected_components_e():
     board[(1, -1)] = "f"
 
     assert board.connected_components() == 1
+
+
+@board_types
+def test_delete(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
+    board[(0, 0)] = "a"
+    board[(2, -3)] = "b"
+
+    del board[(2, -3)]
+    # deleting an empty cell, inside or outside of the board, is a no-op
+    del board[(2, -3)]
+    del board[(-9, 9)]
+
+    assert board[(0, 0)] == "a"
+    assert board[(2, -3)] is None
+    assert board[(-9, 9)] is None
+
+
+@board_types
+def test_items(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
+    board[(3, 2)] = "a"
+    board[(-1, -2)] = "b"
+    board[(0, 0)] = "c"
+    del board[(0, 0)]
+
+    assert set(board.items()) == {((3, 2), "a"), ((-1, -2), "b")}
+
+
+def test_board_does_not_reallocate_within_bounds():
+    board = hive.board.Board()
+    board[(-2, -2)] = "a"
+    board[(2, 2)] = "b"
+    grid = board.grid
+
+    board[(0, 1)] = "c"
+    del board[(0, 1)]
+
+    assert board.grid is grid
+
+
+def _brute_force_pinned(board: hive.board.BaseBoard):
+    pinned = set()
+    components = board.connected_components()
+    for index, tile in list(board.items()):
+        del board[index]
+        if board.connected_components() > components:
+            pinned.add(index)
+        board[index] = tile
+
+    return pinned
+
+
+@board_types
+def test_pinned_chain(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
+    board[(0, 0)] = "a"
+    assert board.pinned() == set()
+
+    board[(0, 1)] = "b"
+    assert board.pinned() == set()
+
+    board[(0, 2)] = "c"
+    assert board.pinned() == {(0, 1)}
+
+    board[(1, 2)] = "d"
+    assert board.pinned() == {(0, 1), (0, 2)}
+    assert board.is_pinned((0, 2))
+    assert not board.is_pinned((1, 2))
+
+
+@board_types
+def test_pinned_ring(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
+    board[(0, 0)] = "a"
+    board[(0, 1)] = "b"
+    board[(1, 1)] = "c"
+    board[(2, 0)] = "d"
+    board[(2, -1)] = "e"
+    assert board.pinned() == {(0, 1), (1, 1), (2, 0)}
+
+    # closing the ring frees up every tile
+    board[(1, -1)] = "f"
+    assert board.pinned() == set()
+
+    # and opening it up again pins the middle of the chain
+    del board[(0, 0)]
+    assert board.pinned() == {(1, 1), (2, 0), (2, -1)}
+
+
+@board_types
+def test_pinned_long_chain(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
+    length = 5000
+    for y in range(length):
+        board[(0, y)] = "a"
+
+    assert board.pinned() == {(0, y) for y in range(1, length - 1)}
+    assert board.connected_components() == 1
+
+
+@board_types
+def test_pinned_matches_brute_force(board_type: Type[hive.board.BaseBoard]):
+    rng = random.Random(0)
+    board = board_type()
+    board[(0, 0)] = "a"
+    for _ in range(60):
+        index, _ = rng.choice(list(board.items()))
+        offset = rng.choice(hive.board.NEIGHBOUR_OFFSETS)
+        board[(index[0] + offset[0], index[1] + offset[1])] = "a"
+        # use the index incrementally before checking it from scratch
+        pinned = set(board.pinned())
+
+        assert pinned == _brute_force_pinned(board)
+
+
+@board_types
+def test_pinned_matches_brute_force_with_deletes(board_type: Type[hive.board.BaseBoard]):
+    rng = random.Random(1)
+    board = board_type()
+    for x in range(-3, 4):
+        for y in range(-3, 4):
+            board[(x, y)] = "a"
+
+    while board.connected_components() == 1:
+        index, _ = rng.choice(list(board.items()))
+        del board[index]
+        pinned = set(board.pinned())
+
+        assert pinned == _brute_force_pinned(board)
+
+
+@board_types
+def test_occupancy(board_type: Type[hive.board.BaseBoard]):
+    rng = random.Random(2)
+    board = board_type()
+    cells = [(x, y) for x in range(-3, 4) for y in range(-3, 4)]
+    for _ in range(200):
+        index = rng.choice(cells)
+        if board[index] is None:
+            board[index] = "a"
+        else:
+            del board[index]
+
+    for x in range(-5, 6):
+        for y in range(-5, 6):
+            expected = sum(
+                1 << position
+                for position, offset in enumerate(hive.board.NEIGHBOUR_OFFSETS)
+                if board[(x + offset[0], y + offset[1])] is not None
+            )
+            assert board.occupancy((x, y)) == expected
+
+
+def test_slides():
+    # no neighbours, so nothing to slide along
+    assert hive.board.SLIDES[0] == ()
+    # a single neighbour to the north can be slid around either way
+    assert hive.board.SLIDES[0b000001] == (1, 5)
+    # neighbours to the north and south east leave a gate to the north east
+    assert hive.board.SLIDES[0b000101] == (3, 5)
+    # surrounded, or with a single gap that is too narrow to get through
+    assert hive.board.SLIDES[0b111111] == ()
+    assert hive.board.SLIDES[0b111110] == ()
+
+
+@board_types
+def test_slides_with_lifted_tile(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
+    board[(0, 0)] = "a"
+    board[(0, 1)] = "b"
+    board[(1, 0)] = "c"
+
+    # the cell that "b" and "c" both touch can slide around either of them
+    assert set(board.slides((1, 1))) == {(0, 2), (2, 0)}
+    assert set(board.slides((0, 0))) == {(-1, 1), (1, -1)}
+    # lifting "c" leaves only "b" to slide along, whereas lifting "a" makes no
+    # difference as it isn't next to the cell
+    assert set(board.slides((1, 1), (1, 0))) == {(1, 0), (0, 2)}
+    assert set(board.slides((1, 1), (0, 0))) == {(0, 2), (2, 0)}
+
+
+@board_types
+def test_copy(board_type: Type[hive.board.BaseBoard]):
+    board = board_type()
+    board[(0, 0)] = "a"
+    board[(0, 1)] = "b"
+    board[(0, 2)] = "c"
+    assert board.pinned() == {(0, 1)}
+
+    clone = board.copy()
+    clone[(1, 1)] = "d"
+    del clone[(0, 0)]
+    board[(-1, 3)] = "e"
+
+    assert set(board.items()) == {((0, 0), "a"), ((0, 1), "b"), ((0, 2), "c"), ((-1, 3), "e")}
+    assert set(clone.items()) == {((0, 1), "b"), ((0, 2), "c"), ((1, 1), "d")}
+    assert board.pinned() == {(0, 1), (0, 2)}
+    assert clone.pinned() == set()
+    assert board.occupancy((1, 1)) == 0b110000
+    assert clone.occupancy((0, 0)) == 0b000001
@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+import hive.book
+import hive.canonical
+import hive.game
+import hive.records
+import hive.tiles
+import hive.tournament
+import tests.helpers
+
+
+def _reflected(moves):
+    # the same game played reflected and shifted across the board
+    def mapping(index):
+        x, y = hive.canonical.SYMMETRIES[7].apply(index)
+        return (x + 4, y - 2)
+
+    return tests.helpers.map_moves(moves, mapping)
+
+
+def test_lookup(tmp_path):
+    path = str(tmp_path / "book.bin")
+    opening = tests.helpers.random_moves(0, 6)
+    others = [(tests.helpers.random_moves(seed, 10), 0.0) for seed in range(1, 6)]
+    games = [(opening, 1.0), (_reflected(opening), 0.5)] + others
+
+    count = hive.book.build(path, games, max_plies=8)
+
+    with hive.book.Book(path) as book:
+        assert len(book) == count
+        assert book.lookup(hive.game.Game()) == sorted(book.lookup(hive.game.Game()), key=lambda entry: -entry.games)
+        assert sum(entry.games for entry in book.lookup(hive.game.Game())) == 7
+
+        # both copies of the opening are pooled, in each one's own coordinates
+        for moves in (opening, _reflected(opening)):
+            game = tests.helpers.play(moves[:5])
+            entries = book.lookup(game)
+            assert entries[0] == hive.book.BookMove(moves[5], 2, 0, 1)
+            assert all(entry.move in game.legal_moves() for entry in entries)
+
+        # black won the other games
+        moves = tests.helpers.random_moves(1, 8)
+        assert book.lookup(tests.helpers.play(moves[:6])) == [hive.book.BookMove(moves[6], 1, 0, 0)]
+        assert book.lookup(tests.helpers.play(moves[:7])) == [hive.book.BookMove(moves[7], 1, 1, 0)]
+
+        assert book.lookup(tests.helpers.play(tests.helpers.random_moves(1, 9))) == []
+
+
+def test_choose(tmp_path):
+    path = str(tmp_path / "book.bin")
+    first = hive.game.Placement(hive.tiles.Ant, (0, 0))
+    replies = [
+        hive.game.Placement(hive.tiles.Spider, (0, 1)),
+        hive.game.Placement(hive.tiles.Bee, (0, 1)),
+    ]
+    games = [([first, replies[0]], 1.0)] * 3 + [([first, replies[1]], 0.0)] * 2
+
+    hive.book.build(path, games, min_games=2)
+
+    with hive.book.Book(path) as book:
+        # the replies come back as any of their symmetric equivalents
+        game = tests.helpers.play([first])
+        assert book.choose(game).tile_type is hive.tiles.Bee
+        assert book.choose(game, min_games=3).tile_type is hive.tiles.Spider
+        assert book.choose(game) in game.legal_moves()
+        assert book.choose(tests.helpers.play(replies)) is None
+
+
+def test_symmetric_moves_are_pooled(tmp_path):
+    path = str(tmp_path / "book.bin")
+    first = hive.game.Placement(hive.tiles.Ant, (0, 0))
+    # every reply next to the first tile is the same up to symmetry
+    games = [([first, hive.game.Placement(hive.tiles.Spider, offset)], 0.5) for offset in [(0, 1), (1, 0), (-1, 1)]]
+
+    assert hive.book.build(path, games) == 2
+
+    with hive.book.Book(path) as book:
+        (entry,) = book.lookup(tests.helpers.play([first]))
+        assert entry.games == 3
+        assert entry.move in tests.helpers.play([first]).legal_moves()
+
+
+def test_book_bot(tmp_path):
+    path = str(tmp_path / "book.bin")
+    records = tmp_path / "games.jsonl"
+    moves = tests.helpers.random_moves(2, 6)
+    records.write_text(json.dumps({"moves": [hive.records.move_to_json(move) for move in moves], "result": 1.0}))
+
+    with open(records) as lines:
+        hive.book.build(path, hive.book.games_from_records(lines))
+
+    # the bot follows the game, up to symmetry
+    with hive.tournament.make_bot(f"random:book={path}", seed=0) as bot:
+        game = hive.game.Game()
+        for plies in range(1, len(moves) + 1):
+            game.push(bot(game))
+            expected = tests.helpers.play(moves[:plies])
+            assert hive.canonical.canonical_tiles(game) == hive.canonical.canonical_tiles(expected)
+
+    # the book is closed along with the bot
+    assert len(bot.book) == 0
+
+
+def test_not_a_book(tmp_path):
+    path = tmp_path / "book.bin"
+    path.write_bytes(b"HIVEBOOK" + bytes(20))
+
+    with pytest.raises(ValueError):
+        hive.book.Book(str(path))
@@ -0,0 +1,61 @@
+import pytest
+
+import hive.canonical
+import hive.game
+import tests.helpers
+
+
+def test_symmetries_are_distinct_and_invertible():
+    cell = (3, 1)
+
+    assert len({symmetry.apply(cell) for symmetry in hive.canonical.SYMMETRIES}) == 12
+    for symmetry in hive.canonical.SYMMETRIES:
+        assert symmetry.invert(symmetry.apply(cell)) == cell
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_equivalent_positions_share_key(seed):
+    moves = tests.helpers.random_moves(seed, 12)
+    game = tests.helpers.random_game(seed, 12)
+    key = hive.canonical.canonical_hash(game)
+    tiles = hive.canonical.canonical_tiles(game)
+
+    for symmetry in hive.canonical.SYMMETRIES:
+        other = tests.helpers.play(tests.helpers.map_moves(
+            moves, lambda index: (symmetry.apply(index)[0] + 3, symmetry.apply(index)[1] - 5),
+        ))
+
+        assert hive.canonical.canonical_hash(other) == key
+        assert hive.canonical.canonical_tiles(other) == tiles
+
+
+def test_different_positions_have_different_keys():
+    games = [tests.helpers.random_game(seed, plies) for seed in range(10) for plies in (6, 7)]
+    keys = {hive.canonical.canonical_hash(game) for game in games}
+
+    assert len(keys) == 20
+
+
+def test_side_to_move_changes_key():
+    game = tests.helpers.random_game(0, 6)
+    key = hive.canonical.canonical_hash(game)
+
+    game.push(hive.game.Pass())
+
+    assert hive.canonical.canonical_hash(game) != key
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_moves_map_to_canonical_form(seed):
+    game = tests.helpers.random_game(seed, 10)
+    result = hive.canonical.canonical(game)
+    moves = tests.helpers.random_moves(seed, 10)
+    canonical_game = tests.helpers.play(tests.helpers.map_moves(moves, result.to_canonical))
+
+    assert hive.canonical.canonical(canonical_game).key == result.key
+    assert min(index for index, _ in canonical_game.board.items()) == (0, 0)
+
+    moves = game.legal_moves()
+    mapped = [result.move_to_canonical(move) for move in moves]
+    assert set(mapped) == set(canonical_game.legal_moves())
+    assert [result.move_from_canonical(move) for move in mapped] == moves
@@ -0,0 +1,69 @@
+import numpy as np
+
+import hive.encoding
+import hive.game
+import hive.perft
+import hive.tiles
+
+W = hive.tiles.Colour.WHITE
+B = hive.tiles.Colour.BLACK
+
+
+def _cells(plane: np.ndarray, origin) -> set:
+    return {(int(x) + origin[0], int(y) + origin[1]) for x, y in zip(*np.nonzero(plane))}
+
+
+def test_encode():
+    encoder = hive.encoding.Encoder()
+    game = hive.perft.setup(hive.perft.POSITIONS["midgame"]())
+    batch = encoder.new_batch(2)
+
+    origin = encoder.encode(game, batch[1])
+    planes = batch[1]
+
+    for tile_type in hive.tiles.TILE_TYPES:
+        for colour in hive.tiles.Colour:
+            assert _cells(planes[encoder.tile_plane(tile_type, colour)], origin) == {
+                index for index, tile in game.board.items() if type(tile) is tile_type and tile.colour == colour
+            }
+
+    assert (planes[encoder.side_plane] == 1).all()
+    # one of white's three ants is still to be placed
+    np.testing.assert_allclose(planes[encoder.rack_planes + hive.tiles.TILE_KINDS[hive.tiles.Ant]], 1 / 3)
+
+    moves = game.legal_moves()
+    assert _cells(planes[encoder.placement_plane], origin) == {
+        move.to_index for move in moves if isinstance(move, hive.game.Placement)
+    }
+    assert _cells(planes[encoder.from_plane], origin) == {
+        move.from_index for move in moves if isinstance(move, hive.game.Movement)
+    }
+    assert _cells(planes[encoder.to_plane], origin) == {
+        move.to_index for move in moves if isinstance(move, hive.game.Movement)
+    }
+
+    # only the slice given is written to
+    assert not batch[0].any()
+
+
+def test_encode_centres_hive():
+    encoder = hive.encoding.Encoder(size=8)
+    game = hive.perft.setup([(W, hive.tiles.Bee, (10, -20)), (B, hive.tiles.Bee, (10, -19))])
+
+    assert encoder.origin(game) == (10 - 4, -20 - 4)
+    assert encoder.origin(hive.game.Game()) == (-4, -4)
+
+
+def test_encode_batch_reuses_buffer():
+    encoder = hive.encoding.Encoder()
+    game = hive.perft.setup(hive.perft.POSITIONS["ring"]())
+    batch = encoder.new_batch(2)
+    batch[...] = 5
+
+    origins = encoder.encode_batch([game, hive.game.Game()], batch)
+
+    assert origins.tolist() == [list(encoder.origin(game)), [-13, -13]]
+    # everything stale is overwritten
+    assert np.isin(batch[0], np.array([0, 1 / 3, 2 / 3, 1], dtype=np.float32)).all()
+    # white to move in the new game, with a full rack and one placement
+    assert batch[1].sum() == encoder.size ** 2 * (1 + 10) + 1
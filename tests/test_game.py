@@ -1,7 +1,14 @@
-from typing import Type
+from typing import List, Set, Tuple, Type
+import collections
+import copy
+import pickle
+import random
+import subprocess
+import sys
 
 import pytest
 
+import hive.board
 import hive.game
 import hive.tiles
 
@@ -18,6 +25,18 @@ def test_create_game():
     hive.game.Game()
 
 
+def test_create_game_with_sparse_board():
+    game = hive.game.Game(hive.board.SparseBoard)
+    game.add_tile(hive.tiles.Spider, (0, 0))
+    game.add_tile(hive.tiles.Bee, (1, 0))
+    game.add_tile(hive.tiles.Bee, (0, -1))
+    game.add_tile(hive.tiles.Spider, (2, 0))
+
+    assert isinstance(game.board, hive.board.SparseBoard)
+    with pytest.raises(hive.game.DisconnectedHiveError):
+        game.move_tile((0, 0), (1, -1))
+
+
 def test_can_play_at_root():
     game = hive.game.Game()
     game.add_tile(hive.tiles.Bee, (0, 0))
@@ -253,3 +272,393 @@ def test_cannot_move_spider_to_invalid_location_smoke():
 @pytest.mark.skip
 def test_other_smokes():
     pass
+
+
+def _apply(game: hive.game.Game, move: hive.game.Move):
+    if isinstance(move, hive.game.Placement):
+        game.add_tile(move.tile_type, move.to_index)
+    elif isinstance(move, hive.game.Movement):
+        game.move_tile(move.from_index, move.to_index)
+
+
+def _brute_force_legal_moves(game: hive.game.Game) -> Set[hive.game.Move]:
+    """
+    Finds the legal moves by trying every plausible move on a copy of the game
+    """
+    perimeter = {(0, 0)}
+    for index, _ in game.board.items():
+        perimeter |= {
+            (index[0] + offset[0], index[1] + offset[1]) for offset in hive.board.NEIGHBOUR_OFFSETS
+        }
+
+    candidates: List[hive.game.Move] = [
+        hive.game.Placement(tile_type, index) for tile_type in hive.tiles.TILE_TYPES for index in perimeter
+    ]
+    candidates.extend(
+        hive.game.Movement(from_index, to_index) for from_index, _ in game.board.items() for to_index in perimeter
+    )
+
+    legal_moves: Set[hive.game.Move] = set()
+    for move in candidates:
+        trial = copy.deepcopy(game)
+        try:
+            _apply(trial, move)
+        except RuntimeError:
+            continue
+        legal_moves.add(move)
+
+    return legal_moves
+
+
+def test_legal_moves_first_move():
+    game = hive.game.Game()
+
+    assert set(game.legal_moves()) == {
+        hive.game.Placement(tile_type, (0, 0)) for tile_type in hive.tiles.TILE_TYPES
+    }
+
+
+def test_legal_moves_must_play_bee():
+    game = hive.game.Game()
+    game.add_tile(hive.tiles.Spider, (0, 0))
+    game.add_tile(hive.tiles.Spider, (0, 1))
+    game.add_tile(hive.tiles.Spider, (0, -1))
+    game.add_tile(hive.tiles.Spider, (0, 2))
+
+    assert {type(move) for move in game.legal_moves()} == {hive.game.Placement}
+    assert {move.tile_type for move in game.legal_moves()} == {hive.tiles.Bee}
+
+
+def test_legal_moves_excludes_pinned_pieces():
+    game = hive.game.Game()
+    game.add_tile(hive.tiles.Spider, (0, 0))
+    game.add_tile(hive.tiles.Bee, (1, 0))
+    game.add_tile(hive.tiles.Bee, (0, -1))
+    game.add_tile(hive.tiles.Spider, (2, 0))
+
+    from_indices = {move.from_index for move in game.legal_moves() if isinstance(move, hive.game.Movement)}
+    assert from_indices == {(0, -1)}
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_legal_moves_matches_brute_force(seed: int):
+    rng = random.Random(seed)
+    game = hive.game.Game()
+    for _ in range(16):
+        legal_moves = game.legal_moves()
+
+        assert len(legal_moves) == len(set(legal_moves))
+        assert set(legal_moves) == _brute_force_legal_moves(game)
+
+        if not legal_moves:
+            break
+        _apply(game, rng.choice(legal_moves))
+
+
+def _snapshot(game: hive.game.Game):
+    return (
+        sorted(game.board.items(), key=lambda item: item[0]),
+        [
+            (player.colour, player.turn, player.bee_played, sorted(map(str, player.unused_tiles)))
+            for player in (game.active_player, game.inactive_player)
+        ],
+        game.first_move,
+        set(game.legal_moves()),
+    )
+
+
+def test_pop_reverts_add_tile_and_move_tile():
+    game = hive.game.Game()
+    game.add_tile(hive.tiles.Bee, (0, 0))
+    game.add_tile(hive.tiles.Bee, (0, 1))
+    before = _snapshot(game)
+
+    game.move_tile((0, 0), (1, 0))
+    assert game.pop() == hive.game.Movement((0, 0), (1, 0))
+    assert _snapshot(game) == before
+
+    assert game.pop() == hive.game.Placement(hive.tiles.Bee, (0, 1))
+    assert game.pop() == hive.game.Placement(hive.tiles.Bee, (0, 0))
+    assert _snapshot(game) == _snapshot(hive.game.Game())
+
+    with pytest.raises(RuntimeError):
+        game.pop()
+
+
+def test_push_pass():
+    game = hive.game.Game()
+    game.push(hive.game.Placement(hive.tiles.Bee, (0, 0)))
+    game.push(hive.game.Pass())
+
+    assert game.active_player.colour == hive.tiles.Colour.WHITE
+    assert game.inactive_player.turn == 1
+    assert game.pop() == hive.game.Pass()
+    assert game.active_player.colour == hive.tiles.Colour.BLACK
+
+
+@pytest.mark.parametrize("board_type", [hive.board.Board, hive.board.SparseBoard, hive.board.PersistentBoard])
+def test_push_pop_round_trip(board_type: Type[hive.board.BaseBoard]):
+    rng = random.Random(0)
+    game = hive.game.Game(board_type)
+    snapshots = []
+    for _ in range(30):
+        legal_moves = game.legal_moves()
+        snapshots.append(_snapshot(game))
+        game.push(rng.choice(legal_moves) if legal_moves else hive.game.Pass())
+
+    while snapshots:
+        game.pop()
+        assert _snapshot(game) == snapshots.pop()
+
+
+def test_hash_tracks_position():
+    rng = random.Random(2)
+    game = hive.game.Game()
+    hashes = []
+    for _ in range(30):
+        assert game.hash == game.compute_hash()
+        hashes.append(game.hash)
+        legal_moves = game.legal_moves()
+        game.push(rng.choice(legal_moves) if legal_moves else hive.game.Pass())
+
+    while hashes:
+        game.pop()
+        assert game.hash == hashes.pop()
+
+
+def test_hash_transposition():
+    game_a = hive.game.Game()
+    game_a.add_tile(hive.tiles.Bee, (0, 0))
+    game_a.add_tile(hive.tiles.Bee, (0, 1))
+    game_a.add_tile(hive.tiles.Ant, (0, -1))
+    game_a.add_tile(hive.tiles.Ant, (0, 2))
+    game_a.add_tile(hive.tiles.Spider, (1, -1))
+
+    game_b = hive.game.Game()
+    game_b.add_tile(hive.tiles.Bee, (0, 0))
+    game_b.add_tile(hive.tiles.Bee, (0, 1))
+    game_b.add_tile(hive.tiles.Spider, (1, -1))
+    game_b.add_tile(hive.tiles.Ant, (0, 2))
+    game_b.add_tile(hive.tiles.Ant, (0, -1))
+
+    assert game_a.hash == game_b.hash
+
+    # moving tiles away and back again repeats the position
+    game_b.move_tile((0, 2), (1, 1))
+    assert game_a.hash != game_b.hash
+    game_b.move_tile((0, -1), (-1, 0))
+    game_b.move_tile((1, 1), (0, 2))
+    game_b.move_tile((-1, 0), (0, -1))
+    assert game_a.hash == game_b.hash
+
+    # the same tiles on the board with a different player to move
+    game_a.push(hive.game.Pass())
+    assert game_a.hash != game_b.hash
+
+
+def _brute_force_placement_cells(game: hive.game.Game, colour: hive.tiles.Colour) -> Set[Tuple[int, int]]:
+    cells = set()
+    for index, _ in game.board.items():
+        for offset in hive.board.NEIGHBOUR_OFFSETS:
+            cell = (index[0] + offset[0], index[1] + offset[1])
+            neighbours = game.board.neighbours(cell)
+            if game.board[cell] is None and all(tile.colour == colour for _, tile in neighbours):
+                cells.add(cell)
+
+    return cells
+
+
+def test_placement_cells():
+    game = hive.game.Game()
+    game.add_tile(hive.tiles.Bee, (0, 0))
+    game.add_tile(hive.tiles.Bee, (1, 0))
+
+    assert game.placement_cells(hive.tiles.Colour.WHITE) == {(-1, 0), (-1, 1), (0, -1)}
+    assert game.placement_cells(hive.tiles.Colour.BLACK) == {(2, 0), (2, -1), (1, 1)}
+
+
+def test_placement_cells_track_moves():
+    rng = random.Random(3)
+    game = hive.game.Game()
+    for _ in range(40):
+        for colour in hive.tiles.Colour:
+            assert game.placement_cells(colour) == _brute_force_placement_cells(game, colour)
+
+        legal_moves = game.legal_moves()
+        game.push(rng.choice(legal_moves) if legal_moves else hive.game.Pass())
+        if rng.random() < 0.2:
+            game.pop()
+
+
+def test_rack_counts():
+    game = hive.game.Game()
+    game.add_tile(hive.tiles.Ant, (0, 0))
+    game.add_tile(hive.tiles.Bee, (0, 1))
+
+    assert game.active_player.count(hive.tiles.Ant) == 2
+    assert game.active_player.rack == [1, 1, 2, 3, 3]
+    assert game.inactive_player.rack == [0, 1, 3, 3, 3]
+    assert len(game.active_player.unused_tiles) == 10
+
+    game.pop()
+    assert game.active_player.rack == list(hive.tiles.TILE_COUNTS)
+
+
+@pytest.mark.parametrize("board_type", [hive.board.Board, hive.board.SparseBoard, hive.board.PersistentBoard])
+def test_clone(board_type: Type[hive.board.BaseBoard]):
+    rng = random.Random(4)
+    game = hive.game.Game(board_type)
+    for _ in range(20):
+        legal_moves = game.legal_moves()
+        game.push(rng.choice(legal_moves) if legal_moves else hive.game.Pass())
+    before = _snapshot(game)
+
+    clone = game.clone()
+    assert _snapshot(clone) == before
+    assert clone.hash == game.hash
+
+    for _ in range(20):
+        legal_moves = clone.legal_moves()
+        clone.push(rng.choice(legal_moves) if legal_moves else hive.game.Pass())
+
+    assert _snapshot(game) == before
+    assert clone.hash == clone.compute_hash()
+    for colour in hive.tiles.Colour:
+        assert clone.placement_cells(colour) == _brute_force_placement_cells(clone, colour)
+
+
+@pytest.mark.parametrize("board_type", [hive.board.Board, hive.board.SparseBoard, hive.board.PersistentBoard])
+def test_replay(board_type: Type[hive.board.BaseBoard]):
+    rng = random.Random(5)
+    game = hive.game.Game(board_type)
+    moves = []
+    for _ in range(40):
+        legal_moves = game.legal_moves()
+        moves.append(rng.choice(legal_moves) if legal_moves else hive.game.Pass())
+        game.push(moves[-1])
+
+    replayed = hive.game.Game.replay(moves, board_type, expected_hash=game.hash)
+
+    assert _snapshot(replayed) == _snapshot(game)
+    for colour in hive.tiles.Colour:
+        assert replayed.placement_cells(colour) == game.placement_cells(colour)
+
+    # the replayed game carries on like any other
+    move = replayed.legal_moves()[0]
+    replayed.push(move)
+    game.push(move)
+    assert replayed.hash == game.hash
+    replayed.pop()
+    with pytest.raises(RuntimeError):
+        replayed.pop()
+
+
+def test_replay_rejects_bad_records():
+    moves = [hive.game.Placement(hive.tiles.Bee, (0, 0)), hive.game.Placement(hive.tiles.Bee, (0, 1))]
+
+    with pytest.raises(hive.game.ReplayError):
+        hive.game.Game.replay(moves, expected_hash=0)
+    with pytest.raises(hive.game.ReplayError):
+        hive.game.Game.replay(moves + [hive.game.Placement(hive.tiles.Ant, (0, 1))])
+    with pytest.raises(hive.game.ReplayError):
+        hive.game.Game.replay(moves + [hive.game.Movement((0, 2), (0, 3))])
+    with pytest.raises(hive.game.ReplayError):
+        hive.game.Game.replay(moves + [hive.game.Pass(), hive.game.Placement(hive.tiles.Bee, (0, 2))])
+
+
+def test_result():
+    game = hive.game.Game()
+    game.push(hive.game.Placement(hive.tiles.Bee, (0, 0)))
+    game.push(hive.game.Placement(hive.tiles.Bee, (1, 0)))
+    tile_types = [hive.tiles.Ant, hive.tiles.Ant, hive.tiles.Spider, hive.tiles.Spider]
+    cells = [(0, -1), (-1, 0), (-1, 1), (1, 1), (2, 0), (2, -1), (0, 1)]
+    for i, index in enumerate(cells):
+        game.push(hive.game.Placement(tile_types[i // 2], index))
+        assert game.result is None
+
+    assert game.bee_neighbours(hive.tiles.Colour.WHITE) == 5
+    assert game.bee_neighbours(hive.tiles.Colour.BLACK) == 5
+
+    # the last cell touches both bees
+    game.push(hive.game.Placement(hive.tiles.Grasshopper, (1, -1)))
+    assert game.result == 0.5
+
+    game.pop()
+    game.push(hive.game.Movement((2, -1), (1, -1)))
+    assert game.bee_neighbours(hive.tiles.Colour.BLACK) == 5
+    assert game.result == 0.0
+    assert game.clone().result == 0.0
+
+    for _ in range(3):
+        game.pop()
+    assert game.bee_neighbours(hive.tiles.Colour.WHITE) == 4
+    assert game.bee_neighbours(hive.tiles.Colour.BLACK) == 3
+
+    for _ in range(6):
+        game.pop()
+    # black's bee is back in its rack
+    assert game.bee_neighbours(hive.tiles.Colour.BLACK) == 0
+
+
+def test_iter_legal_moves():
+    rng = random.Random(3)
+    game = hive.game.Game()
+    for _ in range(30):
+        assert list(game.iter_legal_moves()) == game.legal_moves()
+        assert not game.must_pass()
+        game.push(rng.choice(game.legal_moves()))
+
+
+def test_must_pass():
+    game = hive.game.Game()
+    for move in [
+        hive.game.Placement(hive.tiles.Bee, (0, 0)),
+        hive.game.Placement(hive.tiles.Bee, (0, 1)),
+        hive.game.Placement(hive.tiles.Ant, (1, 1)),
+        hive.game.Pass(),
+        hive.game.Placement(hive.tiles.Ant, (-1, 2)),
+        hive.game.Pass(),
+        hive.game.Placement(hive.tiles.Ant, (0, 2)),
+    ]:
+        game.push(move)
+
+    # black's only empty neighbours touch white, and its bee can't squeeze
+    # out between the white tiles
+    assert game.must_pass()
+    assert game.legal_moves() == []
+    assert game.random_move(random.Random(0)) == hive.game.Pass()
+
+
+def test_random_move_is_uniform():
+    rng = random.Random(0)
+    game = hive.game.Game()
+    game.push(hive.game.Placement(hive.tiles.Bee, (0, 0)))
+    moves = game.legal_moves()
+
+    counts = collections.Counter(game.random_move(rng) for _ in range(100 * len(moves)))
+
+    assert set(counts) == set(moves)
+    assert all(50 < count < 150 for count in counts.values())
+
+
+def test_unpickled_game_in_fresh_process(tmp_path):
+    rng = random.Random(0)
+    game = hive.game.Game(hive.board.Board)
+    for _ in range(8):
+        game.push(game.random_move(rng))
+
+    path = tmp_path / "game.pickle"
+    path.write_bytes(pickle.dumps(game))
+
+    # the fresh process only has numpy once the board is used, never through
+    # the dense board's constructor
+    script = (
+        "import pickle, sys\n"
+        f"game = pickle.loads(open({str(path)!r}, 'rb').read())\n"
+        "print(len(list(game.board.items())), len(game.legal_moves()))\n"
+        "game.board[(50, -50)] = game.board[next(game.board.items())[0]]\n"
+        "print(game.board[(50, -50)] is not None)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+
+    assert output.stdout.split() == [str(len(list(game.board.items()))), str(len(game.legal_moves())), "True"]
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+import hive.game
+import hive.mcts
+import hive.perft
+import tests.helpers
+
+
+def test_result():
+    game = tests.helpers.winning_position()
+    assert game.result is None
+
+    game.push(hive.game.Movement((0, 2), (-1, 1)))
+    assert game.result == 1.0
+
+
+def test_search_requires_budget():
+    with pytest.raises(ValueError):
+        hive.mcts.MCTS().search(hive.game.Game())
+
+
+def test_search_returns_legal_move_and_restores_game():
+    game = hive.perft.setup(hive.perft.POSITIONS["midgame"]())
+    hash_before = game.hash
+
+    move = hive.mcts.MCTS(max_playout_length=10, seed=0).search(game, max_nodes=100)
+
+    assert move in game.legal_moves()
+    assert game.hash == hash_before
+    assert game.hash == game.compute_hash()
+
+
+def test_search_finds_win():
+    game = tests.helpers.winning_position()
+    searcher = hive.mcts.MCTS(max_playout_length=4, seed=0)
+
+    assert searcher.search(game, max_nodes=500) == hive.game.Movement((0, 2), (-1, 1))
+
+
+@pytest.mark.parametrize("time_ms", [5, 50])
+def test_search_respects_time_budget(time_ms):
+    game = hive.perft.setup(hive.perft.POSITIONS["midgame"]())
+    searcher = hive.mcts.MCTS(seed=0)
+
+    start = time.perf_counter()
+    move = searcher.search(game, time_ms=time_ms)
+
+    # a playout stops at the deadline, so at most a ply runs over it
+    assert time.perf_counter() - start < 1.5 * time_ms / 1000 + 0.01
+    assert move in game.legal_moves()
+
+
+def test_search_reuses_tree():
+    game = hive.perft.setup(hive.perft.POSITIONS["midgame"]())
+    searcher = hive.mcts.MCTS(max_playout_length=4, seed=0)
+    searcher.search(game, max_nodes=300)
+    assert searcher.root is not None
+    played = max(searcher.root.children, key=lambda child: len(child.children))
+    reply = max(played.children, key=lambda child: child.visits)
+    assert played.move is not None and reply.move is not None
+    game.push(played.move)
+    game.push(reply.move)
+
+    searcher.search(game, max_nodes=10)
+
+    assert searcher.root is reply
+    assert reply.parent is None
+    assert reply.visits > 10
+    assert game.hash == game.compute_hash()
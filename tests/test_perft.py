@@ -0,0 +1,40 @@
+from typing import List, Type
+
+import pytest
+
+import hive.board
+import hive.game
+import hive.perft
+import hive.tiles
+
+
+@pytest.mark.parametrize("board_type", [hive.board.Board, hive.board.SparseBoard, hive.board.PersistentBoard])
+@pytest.mark.parametrize("position, expected", [
+    ("opening", [5, 150, 2130]),
+    ("midgame", [53, 2931]),
+    ("ant_chain", [74, 5286]),
+    ("ring", [91, 5622]),
+    ("grasshopper_lines", [36, 1888]),
+])
+def test_perft(position: str, expected: List[int], board_type: Type[hive.board.BaseBoard]):
+    game = hive.perft.setup(hive.perft.POSITIONS[position](), board_type=board_type)
+    hash_before = game.hash
+
+    assert [hive.perft.perft(game, depth) for depth in range(1, len(expected) + 1)] == expected
+    assert game.hash == hash_before
+
+
+def test_perft_depth_zero():
+    assert hive.perft.perft(hive.game.Game(), 0) == 1
+
+
+def test_setup():
+    game = hive.perft.setup([
+        (hive.tiles.Colour.BLACK, hive.tiles.Bee, (0, 0)),
+        (hive.tiles.Colour.BLACK, hive.tiles.Ant, (0, 1)),
+    ], to_move=hive.tiles.Colour.BLACK)
+
+    assert game.active_player.colour == hive.tiles.Colour.BLACK
+    assert game.active_player.bee_played
+    assert not game.inactive_player.bee_played
+    assert game.hash == game.compute_hash()
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+import hive.persistent
+
+
+class CollidingKey:
+    # every key hashes the same, to exercise the collision handling
+    def __init__(self, value: int):
+        self.value = value
+
+    def __hash__(self) -> int:
+        return 7
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CollidingKey) and other.value == self.value
+
+
+def test_set_get_delete():
+    mapping: hive.persistent.PersistentDict = hive.persistent.PersistentDict()
+    mapping[(0, 0)] = "a"
+    mapping[(1, -1)] = "b"
+    mapping[(0, 0)] = "c"
+
+    assert mapping[(0, 0)] == "c"
+    assert mapping.get((1, -1)) == "b"
+    assert mapping.get((5, 5)) is None
+    assert (1, -1) in mapping
+    assert len(mapping) == 2
+
+    del mapping[(0, 0)]
+    assert (0, 0) not in mapping
+    assert len(mapping) == 1
+    with pytest.raises(KeyError):
+        del mapping[(0, 0)]
+    with pytest.raises(KeyError):
+        mapping[(0, 0)]
+
+
+@pytest.mark.parametrize("make_key", [lambda value: (value % 37, value // 37), CollidingKey])
+def test_matches_dict(make_key):
+    rng = random.Random(0)
+    mapping: hive.persistent.PersistentDict = hive.persistent.PersistentDict()
+    expected = {}
+    for _ in range(3000):
+        key = make_key(rng.randrange(200))
+        if rng.random() < 0.6:
+            mapping[key] = expected[key] = rng.random()
+        elif key in expected:
+            del mapping[key]
+            del expected[key]
+
+        assert len(mapping) == len(expected)
+
+    assert dict(mapping.items()) == expected
+    assert all(mapping[key] == value for key, value in expected.items())
+
+
+def test_copies_are_independent():
+    original: hive.persistent.PersistentDict = hive.persistent.PersistentDict({(x, 0): x for x in range(100)})
+    clone = original.copy()
+
+    clone[(0, 0)] = -1
+    del clone[(1, 0)]
+    clone[(100, 0)] = 100
+    original[(2, 0)] = -2
+
+    assert original[(0, 0)] == 0
+    assert original[(1, 0)] == 1
+    assert (100, 0) not in original
+    assert clone[(2, 0)] == 2
+    assert len(original) == 100
+    assert len(clone) == 100
@@ -0,0 +1,85 @@
+import json
+
+import pytest
+
+import hive.game
+import hive.records
+import hive.tiles
+import tests.helpers
+
+
+def test_move_round_trip():
+    moves = [
+        hive.game.Placement(hive.tiles.Grasshopper, (0, 0)),
+        hive.game.Placement(hive.tiles.Bee, (-300, 2)),
+        hive.game.Movement((5, -7), (-32768, 32767)),
+        hive.game.Pass(),
+    ]
+
+    records = hive.records.encode_moves(moves)
+
+    assert records.itemsize == 9
+    assert hive.records.decode_moves(records) == moves
+
+
+@pytest.mark.parametrize("move", [
+    hive.game.Placement(hive.tiles.Spider, (1, -1)),
+    hive.game.Movement((0, 0), (-2, 3)),
+    hive.game.Pass(),
+])
+def test_move_json_round_trip(move):
+    assert hive.records.move_from_json(json.loads(json.dumps(hive.records.move_to_json(move)))) == move
+
+
+def test_move_out_of_range():
+    with pytest.raises(ValueError):
+        hive.records.encode_moves([hive.game.Movement((0, 0), (40000, 0))])
+    with pytest.raises(ValueError):
+        hive.records.encode_moves([hive.game.Placement(hive.tiles.Ant, (1, -32769))])
+
+
+def test_archive(tmp_path):
+    path = str(tmp_path / "games.hive")
+    games = [tests.helpers.random_moves(seed, plies) for seed, plies in enumerate([30, 0, 1, 60])]
+
+    hive.records.write_archive(path, games)
+
+    with hive.records.Archive(path) as archive:
+        assert len(archive) == len(games)
+        assert archive[3] == games[3]
+        assert list(archive) == games
+        assert len(archive.records(0)) == 30
+        assert archive.records(1).size == 0
+        with pytest.raises(IndexError):
+            archive.records(4)
+
+
+def test_archive_streams(tmp_path):
+    path = str(tmp_path / "games.hive")
+
+    with hive.records.ArchiveWriter(path) as writer:
+        writer.add(tests.helpers.random_moves(0, 10))
+        writer.add([hive.game.Pass()])
+
+    with hive.records.Archive(path) as archive:
+        assert archive[1] == [hive.game.Pass()]
+
+
+def test_records_outlive_archive(tmp_path):
+    path = str(tmp_path / "games.hive")
+    games = [tests.helpers.random_moves(seed, 10) for seed in range(3)]
+    hive.records.write_archive(path, games)
+
+    with hive.records.Archive(path) as archive:
+        records = [archive.records(game) for game in range(len(archive))]
+
+    assert len(archive) == 0
+    assert [hive.records.decode_moves(game) for game in records] == games
+
+
+def test_not_an_archive(tmp_path):
+    path = tmp_path / "games.hive"
+    path.write_bytes(b"not an archive of any games")
+
+    with pytest.raises(ValueError):
+        hive.records.Archive(str(path))
@@ -1,4 +1,6 @@
 from typing import Set, Tuple, Type
+import copy
+import pickle
 import pytest
 
 import hive.board
@@ -136,3 +138,59 @@ def test_6_neighbours(
 
     valid_moves = tile.valid_moves(tile_index, board)
     assert valid_moves == valid_moves_expected
+
+
+def test_ant_cannot_slide_into_enclosed_hole():
+    board = hive.board.Board[hive.tiles.Tile]()
+    ring = [(0, 2), (1, 1), (2, 0), (2, -1), (2, -2), (1, -2), (0, -2), (-1, -1), (-2, 0), (-2, 1), (-2, 2), (-1, 2)]
+    for index in ring:
+        board[index] = hive.tiles.Spider(hive.tiles.Colour.WHITE)
+    ant = hive.tiles.Ant(hive.tiles.Colour.BLACK)
+    ant_index = (0, 3)
+    board[ant_index] = ant
+
+    valid_moves = ant.valid_moves(ant_index, board)
+    hole = {(0, 0), (0, 1), (1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1)}
+    assert valid_moves.isdisjoint(hole)
+    assert ant_index not in valid_moves
+    # every cell around the outside of the ring is reachable
+    assert len(valid_moves) == 18 - 1
+
+
+def test_ants_share_sliding_graph():
+    board = hive.board.SparseBoard[hive.tiles.Tile]()
+    first_ant = hive.tiles.Ant(hive.tiles.Colour.WHITE)
+    second_ant = hive.tiles.Ant(hive.tiles.Colour.BLACK)
+    board[(0, 0)] = first_ant
+    board[(0, 1)] = hive.tiles.Bee(hive.tiles.Colour.WHITE)
+    board[(0, 2)] = second_ant
+
+    assert first_ant.valid_moves((0, 0), board) == {(1, 0), (1, 1), (1, 2), (0, 3), (-1, 3), (-1, 2), (-1, 1)}
+    assert second_ant.valid_moves((0, 2), board) == {(1, 1), (1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (-1, 2)}
+    # neither ant was lifted off of the board
+    assert board.cells == {(0, 0): first_ant, (0, 1): board[(0, 1)], (0, 2): second_ant}
+
+
+def test_spider_cannot_return_to_start():
+    # three slides can bring the spider back to where it started, which isn't
+    # a move
+    board = hive.board.Board[hive.tiles.Tile]()
+    for index in [(-1, 1), (-1, 2), (0, 2), (1, -2), (1, -1), (1, 1), (2, -1), (2, 0), (3, -1)]:
+        board[index] = hive.tiles.Ant(hive.tiles.Colour.WHITE)
+    spider = hive.tiles.Spider(hive.tiles.Colour.WHITE)
+    board[(0, 0)] = spider
+
+    valid_moves = spider.valid_moves((0, 0), board)
+    assert (0, 0) not in valid_moves
+    assert valid_moves == {(-2, 2), (1, -3)}
+
+
+def test_tiles_are_shared():
+    ant = hive.tiles.Ant(hive.tiles.Colour.WHITE)
+
+    assert hive.tiles.Ant(hive.tiles.Colour.WHITE) is ant
+    assert hive.tiles.Ant(hive.tiles.Colour.BLACK) is not ant
+    assert hive.tiles.Spider(hive.tiles.Colour.WHITE) is not ant
+    assert copy.deepcopy(ant) is ant
+    assert pickle.loads(pickle.dumps(ant)) is ant
+    assert not hasattr(ant, "__dict__")
@@ -0,0 +1,79 @@
+import io
+import json
+
+import pytest
+
+import hive.game
+import hive.records
+import hive.tournament
+
+
+def test_make_bot():
+    bot = hive.tournament.make_bot("alphabeta:max_depth=1,table_size=16", 0)
+    game = hive.game.Game()
+
+    assert bot(game) in game.legal_moves()
+
+    with pytest.raises(ValueError):
+        hive.tournament.make_bot("nobody", 0)
+
+
+@pytest.mark.parametrize("spec", ["mcts:max_nodes=0", "mcts:time_ms=-5", "alphabeta:max_depth=deep"])
+def test_budgets_must_be_positive(spec, monkeypatch, capsys):
+    with pytest.raises(ValueError):
+        hive.tournament.parse_spec(spec)
+
+    monkeypatch.setattr("sys.argv", ["hive.tournament", "--bot", "random", "--bot", spec])
+    with pytest.raises(SystemExit):
+        hive.tournament.main()
+    assert "must be a positive number" in capsys.readouterr().err
+
+    assert hive.tournament.parse_spec("mcts:max_nodes=10,time_ms=0.5") == ("mcts", {"max_nodes": 10, "time_ms": 0.5})
+
+
+def test_schedule_alternates_colours():
+    specs = hive.tournament.schedule(["a", "b", "c"], 2)
+
+    assert [(spec.white, spec.black) for spec in specs] == [
+        ("a", "b"), ("b", "a"), ("a", "c"), ("c", "a"), ("b", "c"), ("c", "b"),
+    ]
+    assert len({spec.seed for spec in specs}) == len(specs)
+
+
+def test_play_is_reproducible():
+    spec = hive.tournament.GameSpec(0, "random", "random", 3, 30, "sparse")
+    record = hive.tournament.play(spec)
+
+    assert record == {**hive.tournament.play(spec), "times": record["times"]}
+    assert len(record["moves"]) == len(record["times"]) <= 30
+
+    # every recorded move was legal when it was played
+    game = hive.game.Game()
+    for data in record["moves"]:
+        move = hive.records.move_from_json(data)
+        assert move in (game.legal_moves() or [hive.game.Pass()])
+        game.push(move)
+
+
+def test_run_streams_records():
+    specs = hive.tournament.schedule(["random", "alphabeta:max_depth=1"], 2, max_moves=20)
+    output = io.StringIO()
+
+    records = list(hive.tournament.run(specs, processes=2, output=output))
+
+    assert sorted(record["game"] for record in records) == [0, 1]
+    assert [json.loads(line) for line in output.getvalue().splitlines()] == records
+
+
+def test_elo_ratings():
+    records = [{"white": "a", "black": "b", "result": 1.0}] * 3 + [{"white": "b", "black": "a", "result": 0.5}]
+
+    ratings = hive.tournament.elo_ratings(records)
+
+    # 3.5 out of 4, plus a virtual draw, is a 4 to 1 score
+    assert ratings["a"] == pytest.approx(-ratings["b"])
+    assert ratings["a"] - ratings["b"] == pytest.approx(400 * 0.60206, abs=0.1)
+
+
+def test_elo_ratings_ignore_self_play():
+    assert hive.tournament.elo_ratings([{"white": "a", "black": "a", "result": 1.0}]) == {}
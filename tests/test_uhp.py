@@ -0,0 +1,106 @@
+import io
+import random
+import subprocess
+import sys
+
+import pytest
+
+import hive.game
+import hive.uhp
+
+
+def _engine(*moves: str) -> hive.uhp.Engine:
+    engine = hive.uhp.Engine()
+    for move in moves:
+        engine.play(move)
+
+    return engine
+
+
+def test_session():
+    engine = hive.uhp.Engine()
+
+    assert engine.respond("newgame") == "Base;NotStarted;White[1]\nok"
+    assert engine.respond("validmoves") == "wQ;wB1;wA1;wS1;wG1\nok"
+    assert engine.respond("play wS1") == "Base;InProgress;Black[1];wS1\nok"
+    assert engine.respond("play bG1 -wS1") == "Base;InProgress;White[2];wS1;bG1 -wS1\nok"
+    assert engine.respond("undo") == "Base;InProgress;Black[1];wS1\nok"
+    assert engine.respond("options") == "ok"
+
+
+def test_errors():
+    engine = _engine("wS1", "bG1 -wS1")
+
+    assert engine.respond("fly") == "err Unknown command fly\nok"
+    assert engine.respond("play wQ").startswith("invalidmove")
+    assert engine.respond("play wS2 bG1-").startswith("invalidmove")
+    assert engine.respond("play wS3 wS1/").startswith("invalidmove")
+    assert engine.respond("play wQ wS1").startswith("invalidmove")
+    assert engine.respond("play wQ wS1/-").startswith("err")
+    assert engine.respond("undo 3").startswith("err")
+    assert engine.respond("newgame Base+MLP").startswith("err")
+    # nothing changed
+    assert engine.game_string() == "Base;InProgress;White[2];wS1;bG1 -wS1"
+
+
+def test_directions():
+    engine = _engine("wS1")
+    moves = ["bQ wS1/", "bQ wS1-", "bQ wS1\\", "bQ /wS1", "bQ -wS1", "bQ \\wS1"]
+
+    # clockwise from our north
+    assert [engine.parse_move(move).to_index for move in moves] == [
+        (0, 1), (1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1),
+    ]
+
+
+def test_newgame_from_game_string():
+    engine = _engine("wS1", "bG1 -wS1", "wQ wS1/", "bQ /bG1")
+
+    replayed = hive.uhp.Engine()
+    assert replayed.respond(f"newgame {engine.game_string()}") == f"{engine.game_string()}\nok"
+    assert replayed.game.hash == engine.game.hash
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_move_strings_round_trip(seed):
+    rng = random.Random(seed)
+    engine = hive.uhp.Engine()
+
+    for _ in range(40):
+        moves = engine.valid_moves()
+        for move in moves:
+            assert engine.parse_move(engine.format_move(move)) == move
+        engine.play(engine.format_move(rng.choice(moves)))
+
+    engine.undo(40)
+    assert engine.names == {}
+    assert engine.game.hash == hive.game.Game().hash
+
+
+def test_bestmove():
+    engine = _engine("wS1", "bG1 -wS1", "wQ wS1/", "bQ /bG1")
+
+    output = engine.respond("bestmove depth 1")
+
+    assert output.endswith("\nok")
+    assert engine.parse_move(output.split("\n")[0]) in engine.game.legal_moves()
+    assert engine.respond("bestmove nodes 5").startswith("err")
+
+
+def test_run():
+    stdout = io.StringIO()
+
+    hive.uhp.Engine().run(io.StringIO("newgame\n\nplay wA1\nexit\nvalidmoves\n"), stdout)
+
+    assert stdout.getvalue() == "id hive\n\nok\nBase;NotStarted;White[1]\nok\nBase;InProgress;Black[1];wA1\nok\n"
+
+
+def test_starts_without_numpy():
+    output = subprocess.run(
+        [sys.executable, "-c", "import sys, hive.uhp; print('numpy' in sys.modules)"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert output.stdout.strip() == "False"
@@ -0,0 +1,33 @@
+import itertools
+
+import hive.tiles
+import hive.zobrist
+
+
+def test_keys_are_distinct():
+    keys = [
+        hive.zobrist.tile_key(tile_type, colour, (x, y), height)
+        for tile_type, colour, x, y, height in itertools.product(
+            hive.tiles.TILE_TYPES, hive.tiles.Colour, range(-8, 9), range(-8, 9), range(3)
+        )
+    ]
+    keys.extend(
+        hive.zobrist.rack_key(tile_type, colour, count)
+        for tile_type, colour, count in itertools.product(hive.tiles.TILE_TYPES, hive.tiles.Colour, range(4))
+    )
+    keys.append(hive.zobrist.SIDE_KEY)
+
+    assert len(set(keys)) == len(keys)
+    assert all(0 <= key < 2 ** 64 for key in keys)
+
+
+def test_keys_are_stable():
+    # keys are stored alongside games so must not change between runs
+    assert hive.zobrist.tile_key(hive.tiles.Bee, hive.tiles.Colour.WHITE, (0, 0)) == 0xFC1F9D47C1A5266C
+
+
+def test_tile_key_cache_is_bounded():
+    for x in range(hive.zobrist._TILE_CACHE_SIZE + 10):
+        hive.zobrist.tile_key(hive.tiles.Ant, hive.tiles.Colour.BLACK, (x, 0))
+
+    assert hive.zobrist._tile_key.cache_info().currsize <= hive.zobrist._TILE_CACHE_SIZE